@@ -1,10 +1,14 @@
 import asyncio
-from typing import Optional
+from collections import OrderedDict
+from typing import Any, List, Mapping, Optional, Tuple
 from loguru import logger
 from aem_browser import AEMBrowser
 from prompt_parser import PromptParser, ParsedPrompt
 from config import settings
 
+# Number of parsed prompts kept for reuse
+PROMPT_CACHE_SIZE = 128
+
 class AEMAgent:
     """Main AI agent for AEM automation"""
     
@@ -12,6 +16,8 @@ class AEMAgent:
         self.browser = AEMBrowser()
         self.parser = PromptParser()
         self.is_logged_in = False
+        self._pending_screenshots: set[asyncio.Task] = set()
+        self._prompt_cache: OrderedDict[str, Tuple[ParsedPrompt, List[str]]] = OrderedDict()
         
     async def start(self):
         """Initialize the agent and browser"""
@@ -25,11 +31,25 @@ class AEMAgent:
     async def stop(self):
         """Cleanup and close the agent"""
         try:
+            await self.wait_for_screenshots()
             await self.browser.close()
             logger.info("AEM Agent stopped successfully")
         except Exception as e:
             logger.error(f"Error stopping AEM Agent: {e}")
     
+    async def wait_for_screenshots(self):
+        """Wait for any background screenshots to finish writing"""
+        if self._pending_screenshots:
+            await asyncio.gather(*self._pending_screenshots, return_exceptions=True)
+    
+    def _screenshot_done(self, task: asyncio.Task):
+        """Forget a finished background screenshot and log it if it did not complete"""
+        self._pending_screenshots.discard(task)
+        if task.cancelled():
+            logger.warning("Background screenshot was cancelled")
+        elif task.exception() is not None:
+            logger.error(f"Background screenshot failed: {task.exception()}")
+    
     async def login(self, username: Optional[str] = None, password: Optional[str] = None) -> bool:
         """Login to AEM"""
         try:
@@ -61,11 +81,8 @@ class AEMAgent:
                     "actions_completed": []
                 }
             
-            # Parse the prompt
-            parsed_prompt = self.parser.parse_prompt(prompt)
-            
-            # Generate execution plan
-            execution_plan = self.parser.generate_execution_plan(parsed_prompt)
+            # Parse the prompt and generate the execution plan
+            parsed_prompt, execution_plan = self._parse_cached(prompt)
             logger.info("Execution plan:")
             for step in execution_plan:
                 logger.info(f"  {step}")
@@ -89,6 +106,22 @@ class AEMAgent:
                 "actions_completed": []
             }
     
+    def _parse_cached(self, prompt: str) -> Tuple[ParsedPrompt, List[str]]:
+        """Parse a prompt and build its plan, reusing results for repeated prompts"""
+        # Content is case sensitive, so only whitespace is normalized
+        key = " ".join(prompt.split())
+        cached = self._prompt_cache.get(key)
+        if cached is not None:
+            self._prompt_cache.move_to_end(key)
+            return cached
+        
+        parsed_prompt = self.parser.parse_prompt(prompt)
+        execution_plan = self.parser.generate_execution_plan(parsed_prompt)
+        self._prompt_cache[key] = (parsed_prompt, execution_plan)
+        if len(self._prompt_cache) > PROMPT_CACHE_SIZE:
+            self._prompt_cache.popitem(last=False)
+        return parsed_prompt, execution_plan
+    
     async def _execute_actions(self, parsed_prompt: ParsedPrompt) -> dict:
         """Execute the parsed actions"""
         actions_completed = []
@@ -138,9 +171,11 @@ class AEMAgent:
                             "actions_completed": actions_completed
                         }
             
-            # Take a screenshot of the final result
-            await self.browser.take_screenshot("final_result.png")
-            actions_completed.append("Screenshot saved as final_result.png")
+            # Take a screenshot of the final result in the background; the callback logs how it ended
+            task = asyncio.create_task(self.browser.take_screenshot("final_result.jpg"))
+            task.add_done_callback(self._screenshot_done)
+            self._pending_screenshots.add(task)
+            actions_completed.append("Screenshot scheduled: final_result.jpg")
             
             return {
                 "success": True,
@@ -155,7 +190,7 @@ class AEMAgent:
                 "actions_completed": actions_completed
             }
     
-    async def _execute_create_page(self, parameters: dict) -> bool:
+    async def _execute_create_page(self, parameters: Mapping[str, Any]) -> bool:
         """Execute page creation action"""
         try:
             success = await self.browser.create_page(
@@ -173,7 +208,7 @@ class AEMAgent:
             logger.error(f"Failed to create page: {e}")
             return False
     
-    async def _execute_add_component(self, parameters: dict) -> bool:
+    async def _execute_add_component(self, parameters: Mapping[str, Any]) -> bool:
         """Execute add component action"""
         try:
             await self.browser.add_component(parameters['component_name'])
@@ -183,7 +218,7 @@ class AEMAgent:
             logger.error(f"Failed to add component: {e}")
             return False
     
-    async def _execute_edit_content(self, parameters: dict) -> bool:
+    async def _execute_edit_content(self, parameters: Mapping[str, Any]) -> bool:
         """Execute edit content action"""
         try:
             await self.browser.edit_component_content(parameters['content'])
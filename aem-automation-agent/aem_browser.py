@@ -1,8 +1,36 @@
-import asyncio
-from playwright.async_api import async_playwright, Browser, Page, BrowserContext
+import os
+from playwright.async_api import async_playwright, Browser, Page, BrowserContext, Locator, Route
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 from loguru import logger
 from config import settings
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Sequence
+from urllib.parse import quote, urlsplit
+
+def aem_origin() -> str:
+    """Scheme and host of the configured AEM URL, ignoring any path such as /sites.html/content"""
+    parsed = urlsplit(settings.aem_base_url)
+    if parsed.scheme and parsed.netloc:
+        return f"{parsed.scheme}://{parsed.netloc}"
+    return settings.aem_base_url.rstrip('/')
+
+# Chromium flags that trim background work the automation does not need
+BROWSER_ARGS = [
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-background-networking',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-renderer-backgrounding',
+    '--disable-features=TranslateUI,BackForwardCache,site-per-process',
+    # Keeps navigator.webdriver unset so AEM serves the same UI as to a normal session
+    '--disable-blink-features=AutomationControlled',
+    '--disable-extensions',
+    '--mute-audio',
+    '--no-first-run',
+    '--disable-default-apps'
+]
+
+# Resource types the automation never interacts with
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "font", "media"})
 
 class AEMBrowser:
     """Browser automation class for AEM interactions"""
@@ -12,20 +40,53 @@ class AEMBrowser:
         self.browser: Optional[Browser] = None
         self.context: Optional[BrowserContext] = None
         self.page: Optional[Page] = None
+        self.is_shared = False
+        self.has_saved_session = False
+        self._locators: Dict[str, Locator] = {}
+        self._sites_icon: Optional[Locator] = None
+        self._overlay_button: Optional[Locator] = None
         
     async def start(self):
         """Initialize browser and create context"""
         try:
             self.playwright = await async_playwright().start()
-            self.browser = await self.playwright.chromium.launch(
-                headless=settings.headless_mode,
-                args=['--no-sandbox', '--disable-dev-shm-usage']
-            )
-            self.context = await self.browser.new_context(
-                viewport={'width': 1435, 'height': 800}
-            )
+            
+            # Reuse the browser daemon (and its AEM session) when one is running
+            if settings.browser_cdp_url:
+                try:
+                    self.browser = await self.playwright.chromium.connect_over_cdp(settings.browser_cdp_url)
+                    self.context = self.browser.contexts[0]
+                    self.is_shared = True
+                    logger.info(f"Connected to shared browser at {settings.browser_cdp_url}")
+                except Exception as e:
+                    logger.warning(f"Could not connect to shared browser, launching a new one: {e}")
+            
+            if not self.is_shared:
+                self.browser = await self.playwright.chromium.launch(
+                    headless=settings.headless_mode,
+                    args=BROWSER_ARGS
+                )
+                # Restore cookies from the last successful login if available
+                self.has_saved_session = os.path.exists(settings.auth_state_file)
+                self.context = await self.browser.new_context(
+                    viewport={'width': 1435, 'height': 800},
+                    storage_state=settings.auth_state_file if self.has_saved_session else None,
+                    bypass_csp=True,
+                    service_workers='block'
+                )
+            
+            if settings.block_media:
+                await self.context.route("**/*", self._route_filter)
+            
             self.page = await self.context.new_page()
+            if self.is_shared:
+                await self.page.set_viewport_size({'width': 1435, 'height': 800})
             self.page.set_default_timeout(settings.browser_timeout)
+            
+            # Locators for static AEM chrome are resolved lazily, so build them once
+            self._locators.clear()
+            self._sites_icon = self.page.locator("coral-masonry-item").filter(has_text="Sites").first
+            self._overlay_button = self.page.locator("#OverlayWrapper button").first
             logger.info("Browser initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize browser: {e}")
@@ -36,7 +97,8 @@ class AEMBrowser:
         try:
             if self.page:
                 await self.page.close()
-            if self.context:
+            # A shared context belongs to the daemon; closing the browser only disconnects
+            if self.context and not self.is_shared:
                 await self.context.close()
             if self.browser:
                 await self.browser.close()
@@ -46,13 +108,61 @@ class AEMBrowser:
         except Exception as e:
             logger.error(f"Error closing browser: {e}")
     
+    async def _route_filter(self, route: Route):
+        """Abort requests for images, fonts and media"""
+        if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        else:
+            await route.continue_()
+    
+    async def _bulk_fill(self, fields: Dict[str, str]) -> List[str]:
+        """Set several input values in one evaluate call, returning selectors it could not fill"""
+        return await self.page.evaluate(
+            """(fields) => {
+                const missing = [];
+                for (const [selector, value] of Object.entries(fields)) {
+                    const el = document.querySelector(selector);
+                    if (!el || el.disabled) {
+                        missing.push(selector);
+                        continue;
+                    }
+                    el.value = value;
+                    el.dispatchEvent(new Event('input', {bubbles: true}));
+                    el.dispatchEvent(new Event('change', {bubbles: true}));
+                }
+                return missing;
+            }""",
+            fields
+        )
+    
+    def _text_locator(self, text: str) -> Locator:
+        """Return a cached locator for the first element with the exact text"""
+        locator = self._locators.get(text)
+        if locator is None:
+            locator = self.page.get_by_text(text, exact=True).first
+            self._locators[text] = locator
+        return locator
+    
+    async def _wait_ready(self, selector: str, timeout: int = 10000, state: str = "visible"):
+        """Wait until the element the next step interacts with is ready"""
+        await self.page.locator(selector).first.wait_for(state=state, timeout=timeout)
+    
     async def login_to_aem(self, username: str, password: str) -> bool:
         """Login to AEM using provided credentials"""
         try:
-            logger.info("Starting AEM login process")
+            logger.debug("Starting AEM login process")
             
             # Navigate to AEM start page
-            await self.page.goto(f"{settings.aem_base_url}/aem/start")
+            await self.page.goto(f"{aem_origin()}/aem/start")
+            
+            # A shared browser or restored cookies may still hold an authenticated session
+            if self.is_shared or self.has_saved_session:
+                try:
+                    await self._wait_ready("coral-masonry", timeout=2000)
+                    logger.info("Reusing existing AEM session")
+                    return True
+                except Exception:
+                    pass
             
             # Wait for password field and enter credentials
             await self.page.wait_for_selector("#password", timeout=10000)
@@ -61,13 +171,11 @@ class AEMBrowser:
             # Click sign on button
             await self.page.click("#signOnButton")
             
-            # Wait for navigation to complete
-            await self.page.wait_for_load_state("networkidle")
-            
             # Check if login was successful by looking for AEM interface elements
             try:
-                await self.page.wait_for_selector("coral-masonry", timeout=10000)
+                await self._wait_ready("coral-masonry")
                 logger.info("Login successful")
+                await self.context.storage_state(path=settings.auth_state_file)
                 return True
             except:
                 logger.error("Login failed - AEM interface not found")
@@ -80,27 +188,40 @@ class AEMBrowser:
     async def navigate_to_sites(self):
         """Navigate to Sites section"""
         try:
-            logger.info("Navigating to Sites")
+            logger.debug("Navigating to Sites")
             # Click on Sites icon
-            await self.page.click("coral-masonry-item:nth-of-type(4) coral-icon")
-            await self.page.wait_for_load_state("networkidle")
-            logger.info("Successfully navigated to Sites")
+            await self._sites_icon.click()
+            await self._wait_ready("button.granite-collection-create")
+            logger.debug("Successfully navigated to Sites")
         except Exception as e:
             logger.error(f"Failed to navigate to Sites: {e}")
             raise
     
-    async def navigate_to_path(self, path_segments: list):
+    async def navigate_to_path(self, path_segments: Sequence[str]):
         """Navigate through folder structure using path segments"""
         try:
-            logger.info(f"Navigating to path: {' -> '.join(path_segments)}")
-            
+            logger.debug(f"Navigating to path: {' -> '.join(path_segments)}")
+            
+            # Jump straight to the folder when the segments match the content node names
+            sites_root = f"{aem_origin()}/sites.html/content"
+            url = f"{sites_root}/" + '/'.join(quote(segment, safe='') for segment in path_segments)
+            response = await self.page.goto(url, wait_until="domcontentloaded")
+            if response and response.ok and self.page.url.startswith(url):
+                try:
+                    await self._wait_ready("button.granite-collection-create")
+                    logger.info(f"Navigated directly to: {url}")
+                    return
+                except PlaywrightTimeoutError:
+                    # The URL rendered but is not a folder console, e.g. an error page
+                    pass
+            
+            # Otherwise walk the folder tree from the Sites root by title
+            logger.debug(f"Direct navigation to {url} failed, clicking through folders")
+            await self.page.goto(sites_root, wait_until="domcontentloaded")
             for segment in path_segments:
                 # Look for the folder with the given name
-                folder_selector = f"text/{segment}"
-                await self.page.wait_for_selector(folder_selector, timeout=5000)
-                await self.page.click(folder_selector)
-                await self.page.wait_for_load_state("networkidle")
-                logger.info(f"Navigated to: {segment}")
+                await self._text_locator(segment).click(timeout=5000)
+                logger.debug(f"Navigated to: {segment}")
                 
         except Exception as e:
             logger.error(f"Failed to navigate to path: {e}")
@@ -109,31 +230,40 @@ class AEMBrowser:
     async def create_page(self, page_name: str, page_title: str, template_index: int = 49) -> bool:
         """Create a new page with specified name and title"""
         try:
-            logger.info(f"Creating page: {page_name}")
+            logger.debug(f"Creating page: {page_name}")
             
             # Click Create button
             await self.page.click("button.granite-collection-create")
-            await asyncio.sleep(1)
+            await self._wait_ready("coral-shell a.cq-siteadmin-admin-createpage", state="attached")
             
             # Click Page option
             await self.page.click("coral-shell a.cq-siteadmin-admin-createpage")
-            await self.page.wait_for_load_state("networkidle")
             
-            # Select template (using the index from the recording)
-            template_selector = f"coral-masonry-item:nth-of-type({template_index}) img"
-            await self.page.wait_for_selector(template_selector, timeout=10000)
+            # Select template by its id when configured, otherwise by the index from the recording
+            if settings.template_id:
+                template_selector = f'coral-masonry-item[data-foundation-collection-item-id*="{settings.template_id}"] img'
+            else:
+                template_selector = f"coral-masonry coral-masonry-item >> nth={template_index - 1} >> img"
+            await self._wait_ready(template_selector, state="attached")
             await self.page.click(template_selector)
             
             # Click Next
             await self.page.click("coral-panel.is-selected button")
-            await asyncio.sleep(1)
-            
-            # Fill in page details
-            await self.page.fill("#coral-id-72", page_name)  # Page name
-            await self.page.fill("#coral-id-73", page_title)  # Page title
-            
-            # Fill other required fields based on the recording
-            await self.page.fill("#coral-id-74", page_title)  # Description
+            await self._wait_ready("#coral-id-72", state="attached")
+            
+            # Fill in page details (name, title, description) in a single round-trip
+            text_fields = {
+                "#coral-id-72": page_name,  # Page name
+                "#coral-id-73": page_title,  # Page title
+                "#coral-id-74": page_title,  # Description
+            }
+            missing = await self._bulk_fill(text_fields)
+            for selector in missing:
+                # AEM sometimes disables later fields until earlier ones validate
+                logger.debug(f"Bulk fill skipped {selector}, filling it directly")
+                await self.page.locator(selector).fill(text_fields[selector], no_wait_after=True)
+            
+            # Autocomplete fields open a dropdown, so fill and pick each in turn
             await self.page.fill("#coral-id-75", "o")  # Some field
             
             # Select from dropdown options (based on recording pattern)
@@ -148,11 +278,11 @@ class AEMBrowser:
             
             # Click Create
             await self.page.click("coral-panel.is-selected button.coral3-Button--primary")
-            await asyncio.sleep(2)
+            await self._wait_ready("coral-dialog button.coral3-Button--primary", state="attached")
             
             # Confirm creation
             await self.page.click("coral-dialog button.coral3-Button--primary")
-            await self.page.wait_for_load_state("networkidle")
+            await self.page.wait_for_selector("coral-dialog", state="hidden")
             
             logger.info(f"Page '{page_name}' created successfully")
             return True
@@ -164,15 +294,13 @@ class AEMBrowser:
     async def open_page_editor(self, page_name: str):
         """Open the page editor for the specified page"""
         try:
-            logger.info(f"Opening editor for page: {page_name}")
+            logger.debug(f"Opening editor for page: {page_name}")
             
             # Find and click the page to edit
-            page_selector = f"text/{page_name}"
-            await self.page.wait_for_selector(page_selector, timeout=10000)
-            await self.page.click(page_selector)
+            await self._text_locator(page_name).click(timeout=10000)
             
             # The page should automatically open in editor mode
-            await self.page.wait_for_load_state("networkidle")
+            await self._wait_ready("div.cq-draggable")
             logger.info("Page editor opened successfully")
             
         except Exception as e:
@@ -182,20 +310,17 @@ class AEMBrowser:
     async def add_component(self, component_name: str = "Article Paragraph"):
         """Add a component to the page"""
         try:
-            logger.info(f"Adding component: {component_name}")
+            logger.debug(f"Adding component: {component_name}")
             
             # Click on the container to add component
             await self.page.click("div.cq-draggable > div > div")
-            await asyncio.sleep(1)
             
             # Click the add component button
-            await self.page.click("#OverlayWrapper button:nth-of-type(1) > coral-icon")
-            await asyncio.sleep(1)
+            await self._overlay_button.click(timeout=10000)
             
             # Select the component from the list
-            component_selector = f"text/{component_name}"
-            await self.page.click(component_selector)
-            await asyncio.sleep(2)
+            await self._text_locator(component_name).click(timeout=10000)
+            await self._wait_ready("div.cq-draggable > div > div.cq-draggable")
             
             logger.info(f"Component '{component_name}' added successfully")
             
@@ -206,25 +331,23 @@ class AEMBrowser:
     async def edit_component_content(self, content: str):
         """Edit the content of a component"""
         try:
-            logger.info("Editing component content")
+            logger.debug("Editing component content")
             
             # Click on the component to select it
             await self.page.click("div.cq-draggable > div > div.cq-draggable")
-            await asyncio.sleep(1)
             
             # Click edit button
-            await self.page.click("#OverlayWrapper button:nth-of-type(1) > coral-icon")
-            await asyncio.sleep(2)
+            await self._overlay_button.click(timeout=10000)
             
             # Find the rich text editor and add content
             editor_selector = "div.rte-editorWrapper > div"
             await self.page.wait_for_selector(editor_selector, timeout=10000)
             await self.page.click(editor_selector)
-            await self.page.fill(editor_selector, content)
+            await self.page.locator(editor_selector).fill(content, no_wait_after=True)
             
             # Exit edit mode
-            await self.page.click("#FullScreenWrapper div:nth-of-type(4) button.rte--modechanger > coral-icon")
-            await asyncio.sleep(1)
+            await self.page.click("#FullScreenWrapper button.rte--modechanger")
+            await self.page.wait_for_selector(editor_selector, state="hidden")
             
             logger.info("Component content updated successfully")
             
@@ -235,15 +358,15 @@ class AEMBrowser:
     async def preview_page(self):
         """Preview the page as published"""
         try:
-            logger.info("Opening page preview")
+            logger.debug("Opening page preview")
             
             # Click page info button
-            await self.page.click("coral-actionbar-primary > coral-actionbar-item:nth-of-type(2) coral-icon")
-            await asyncio.sleep(1)
+            await self.page.click("coral-actionbar-primary > coral-actionbar-item >> nth=1")
+            await self._wait_ready("button.pageinfo-viewaspublished")
             
             # Click View as Published
             await self.page.click("button.pageinfo-viewaspublished")
-            await self.page.wait_for_load_state("networkidle")
+            await self.page.wait_for_load_state("domcontentloaded")
             
             logger.info("Page preview opened successfully")
             
@@ -251,10 +374,13 @@ class AEMBrowser:
             logger.error(f"Failed to open page preview: {e}")
             raise
     
-    async def take_screenshot(self, filename: str = "screenshot.png"):
-        """Take a screenshot of the current page"""
+    async def take_screenshot(self, filename: str = "screenshot.png", jpeg_quality: int = 70):
+        """Take a screenshot of the current page (JPEG for .jpg/.jpeg filenames)"""
         try:
-            await self.page.screenshot(path=filename)
+            if filename.lower().endswith(('.jpg', '.jpeg')):
+                await self.page.screenshot(path=filename, type="jpeg", quality=jpeg_quality, caret="hide")
+            else:
+                await self.page.screenshot(path=filename, caret="hide")
             logger.info(f"Screenshot saved as {filename}")
         except Exception as e:
             logger.error(f"Failed to take screenshot: {e}")
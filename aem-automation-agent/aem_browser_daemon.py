@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+AEM Browser Daemon
+Keeps a single Chromium instance running so CLI invocations can reuse it
+"""
+
+import asyncio
+from playwright.async_api import async_playwright
+from loguru import logger
+from aem_browser import BROWSER_ARGS
+from config import settings
+
+async def run_daemon():
+    """Launch Chromium with a CDP endpoint and keep it alive until interrupted"""
+    playwright = await async_playwright().start()
+    browser = await playwright.chromium.launch(
+        headless=settings.headless_mode,
+        args=BROWSER_ARGS + [f'--remote-debugging-port={settings.browser_debug_port}']
+    )
+
+    logger.info(f"Browser daemon listening on http://localhost:{settings.browser_debug_port}")
+    logger.info(f"Set BROWSER_CDP_URL=http://localhost:{settings.browser_debug_port} to reuse it")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await browser.close()
+        await playwright.stop()
+        logger.info("Browser daemon stopped")
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run_daemon())
+    except KeyboardInterrupt:
+        pass
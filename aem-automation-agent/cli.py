@@ -43,7 +43,7 @@ class AEMAgentCLI:
         # Interactive loop
         while True:
             try:
-                user_input = input("🎯 Enter your instruction: ").strip()
+                user_input = (await self._ainput("🎯 Enter your instruction: ")).strip()
                 
                 if user_input.lower() in ['quit', 'exit', 'q']:
                     break
@@ -123,6 +123,10 @@ class AEMAgentCLI:
         finally:
             await self.agent.stop()
     
+    async def _ainput(self, prompt: str) -> str:
+        """Read a line of input without blocking the event loop"""
+        return await asyncio.to_thread(input, prompt)
+    
     async def _handle_login(self) -> bool:
         """Handle the login process"""
         if settings.aem_username and settings.aem_password:
@@ -130,8 +134,8 @@ class AEMAgentCLI:
             return await self.agent.login()
         else:
             print("🔐 Please enter your AEM credentials:")
-            username = input("Username: ").strip()
-            password = input("Password: ").strip()
+            username = (await self._ainput("Username: ")).strip()
+            password = (await self._ainput("Password: ")).strip()
             
             if not username or not password:
                 print("❌ Username and password are required")
@@ -200,11 +204,12 @@ Examples:
     
     args = parser.parse_args()
     
-    # Configure logging
+    # Configure logging, replacing loguru's default synchronous DEBUG handler on stderr
+    logger.remove()
     if args.verbose:
-        logger.add(sys.stdout, level="DEBUG")
+        logger.add(sys.stdout, level="DEBUG", enqueue=True)
     else:
-        logger.add(sys.stdout, level="INFO")
+        logger.add(sys.stdout, level="INFO", enqueue=True)
     
     # Override headless setting if specified
     if args.headless:
@@ -1,23 +1,26 @@
-import os
-from dotenv import load_dotenv
-from pydantic_settings import BaseSettings
-
-load_dotenv()
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     # AEM Configuration
-    aem_base_url: str = os.getenv("AEM_BASE_URL", "https://author-ppe-ams.ewp.thomsonreuters.com/sites.html/content")
-    aem_username: str = os.getenv("AEM_USERNAME", "")
-    aem_password: str = os.getenv("AEM_PASSWORD", "")
+    aem_base_url: str = "https://author-ppe-ams.ewp.thomsonreuters.com"
+    aem_username: str = ""
+    aem_password: str = ""
     
     # AI Configuration
-    openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
+    openai_api_key: str = ""
     
     # Browser Configuration
-    headless_mode: bool = os.getenv("HEADLESS_MODE", "false").lower() == "true"
-    browser_timeout: int = int(os.getenv("BROWSER_TIMEOUT", "30000"))
+    headless_mode: bool = False
+    browser_timeout: int = 30000
+    block_media: bool = True
+    browser_cdp_url: str = ""
+    browser_debug_port: int = 9222
+    auth_state_file: str = "aem_auth.json"
+    
+    # Page Creation
+    template_id: str = ""
     
-    class Config:
-        env_file = ".env"
+    # Values are read from the environment and .env by pydantic-settings
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 settings = Settings()
@@ -1,47 +1,91 @@
 import re
-from typing import Dict, List, Optional, Any
-from pydantic import BaseModel
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Any, Sequence, Set, Tuple
 from loguru import logger
 
-class AEMAction(BaseModel):
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+def compile_pattern(pattern: str):
+    """Compile with the linear-time RE2 engine when available, otherwise with re"""
+    if re2 is not None:
+        try:
+            return re2.compile(pattern)
+        except Exception:
+            pass
+    return re.compile(pattern)
+
+@dataclass(frozen=True)
+class AEMAction:
     """Represents a single AEM action to be performed"""
     action_type: str
-    parameters: Dict[str, Any]
+    parameters: Mapping[str, Any]
 
-class ParsedPrompt(BaseModel):
-    """Represents a parsed user prompt with extracted actions"""
+@dataclass(frozen=True)
+class ParsedPrompt:
+    """Represents a parsed user prompt with extracted actions
+    
+    Parses are cached and shared between callers, so actions, parameters and
+    paths are stored as read-only tuples and mappings.
+    """
     original_prompt: str
-    actions: List[AEMAction]
-    target_path: Optional[List[str]] = None
+    actions: Tuple[AEMAction, ...]
+    target_path: Optional[Sequence[str]] = None
     page_name: Optional[str] = None
     page_title: Optional[str] = None
 
 class PromptParser:
     """Parses natural language prompts into structured AEM actions"""
     
+    # Default path based on the recording
+    _DEFAULT_PATH: Tuple[str, ...] = ('ewp-marketing-websites', 'test-site', 'gl', 'en', 'tax', 'Joseph test')
+    
+    # Execution plan wording per action type, filled from the action parameters
+    _PLAN_TEMPLATES = {
+        'create_page': "Create page '{page_name}' with title '{page_title}'",
+        'add_component': "Add {component_name} component",
+        'edit_content': "Update content with: '{content}'"
+    }
+    
+    # Keywords that decide which extractors are worth running on a prompt
+    _TRIGGER_KEYWORDS = {
+        'page': r'page',
+        'navigation': r'(?:in|under)\s|go to|navigate to',
+        'component': r'component|element',
+        'content': r'fill|update|edit|change|content|text|write'
+    }
+    
     def __init__(self):
+        # Single source for the extraction patterns; components are matched by synonym instead
         self.action_patterns = {
             'create_page': [
                 r'create.*page.*(?:called|named)\s+["\']?([^"\']+)["\']?',
                 r'make.*new.*page.*["\']?([^"\']+)["\']?',
                 r'add.*page.*["\']?([^"\']+)["\']?'
             ],
-            'add_component': [
-                r'add.*(?:an?|the)?\s*([^,]+?)\s*(?:component|element)',
-                r'insert.*(?:an?|the)?\s*([^,]+?)\s*(?:component|element)',
-                r'place.*(?:an?|the)?\s*([^,]+?)\s*(?:component|element)',
-                r'add.*(?:component|element).*["\']?([^"\']+)["\']?',
-                r'insert.*(?:component|element).*["\']?([^"\']+)["\']?',
-                r'place.*(?:component|element).*["\']?([^"\']+)["\']?'
-            ],
             'edit_content': [
-                r'(?:fill|update|edit|change).*(?:with|to)\s+["\']?([^"\']+)["\']?',
-                r'(?:content|text).*["\']?([^"\']+)["\']?',
-                r'write.*["\']?([^"\']+)["\']?'
+                r'(?:fill|update|edit|change).*(?:with|to)\s+["\']([^"\']+)["\']',
+                r'(?:content|text).*["\']([^"\']+)["\']',
+                r'write\s+["\']([^"\']+)["\']'
             ],
             'navigate_to': [
-                r'(?:go to|navigate to|open)\s+([^,]+)',
-                r'(?:in|under)\s+([^,]+)(?:\s+folder|\s+directory)?'
+                r'(?:in|under)\s+([^,]+?)(?:\s+folder|\s+directory|,|$)',
+                r'(?:go to|navigate to)\s+([^,]+?)(?:,|$)'
             ]
         }
         
@@ -51,62 +95,173 @@ class PromptParser:
             'text': 'Article Paragraph',
             'content': 'Article Paragraph',
             'hero': 'Hero Banner',
+            'hero banner': 'Hero Banner',
             'banner': 'Hero Banner',
             'image': 'Image',
             'title': 'Title',
             'heading': 'Title'
         }
+        
+        # Patterns used by the _extract_* helpers, compiled once per parser.
+        # They run against the lowercased prompt, so none of them needs IGNORECASE
+        # Page and content alternatives are tried in one scan; navigation keeps its priority order
+        self._page_pattern = self._compile_alternation(self.action_patterns['create_page'])
+        self._content_pattern = self._compile_alternation(self.action_patterns['edit_content'])
+        self._navigation_patterns = self._compile(self.action_patterns['navigate_to'])
+        # Longest synonyms first so 'article paragraph' wins over 'paragraph'
+        self._component_trie = compile_pattern(
+            r'\b(' + '|'.join(
+                re.escape(synonym) for synonym in sorted(self.component_mappings, key=len, reverse=True)
+            ) + r')\b'
+        )
+        # The noun phrase between add/insert/place and component/element, e.g. 'add a [hero banner] component'.
+        # The tempered span stops at a later verb or clause break (RE2 has no lookaheads, so this one always uses re)
+        self._component_phrase = re.compile(
+            r'\b(?:add|insert|place)\b((?:(?!\b(?:add|insert|place)\b)[^,.;])*?)\b(?:component|element)'
+        )
+        # One pass over the prompt finds which extractors can possibly match.
+        # Lookaheads keep the scan zero-width so overlapping keywords are all seen
+        # (RE2 has no lookaheads, so this one always uses re).
+        self._trigger_scan = re.compile(
+            '(?=' + '|'.join(f'(?P<{name}>{pattern})' for name, pattern in self._TRIGGER_KEYWORDS.items()) + ')'
+        )
+        # Hyperscan, when installed, runs the same keywords as one SIMD block scan
+        self._trigger_database = self._build_trigger_database()
+        self._trigger_lock = threading.Lock()
+        self._quoted = compile_pattern(r'["\'][^"\']*["\']')
+        self._component_automaton = self._build_component_automaton()
+        self._path_separator = compile_pattern(r'[>/\\]')
+        self._url_unsafe = compile_pattern(r'[^a-zA-Z0-9\-]')
+        
+        # Parsing is a pure function of the prompt, so repeated prompts reuse the result
+        self._parse_cached = lru_cache(maxsize=256)(self._parse_prompt)
+    
+    def _build_component_automaton(self):
+        """Build an Aho-Corasick automaton over the component synonyms"""
+        if ahocorasick is None:
+            return None
+        automaton = ahocorasick.Automaton()
+        for synonym, component in self.component_mappings.items():
+            automaton.add_word(synonym, (len(synonym), component))
+        automaton.make_automaton()
+        return automaton
+    
+    def _build_trigger_database(self):
+        """Compile the trigger keywords into a Hyperscan block-mode database"""
+        if hyperscan is None:
+            return None
+        database = hyperscan.Database()
+        database.compile(
+            expressions=[pattern.encode() for pattern in self._TRIGGER_KEYWORDS.values()],
+            ids=list(range(len(self._TRIGGER_KEYWORDS))),
+            elements=len(self._TRIGGER_KEYWORDS),
+            flags=hyperscan.HS_FLAG_SINGLEMATCH
+        )
+        return database
+    
+    def _scan_triggers(self, lowered: str) -> Set[str]:
+        """Return the extractor categories whose keywords appear in the lowercased prompt"""
+        if self._trigger_database is None:
+            return {match.lastgroup for match in self._trigger_scan.finditer(lowered)}
+        
+        names = list(self._TRIGGER_KEYWORDS)
+        triggers = set()
+        
+        def on_match(pattern_id, start, end, flags, context):
+            triggers.add(names[pattern_id])
+        
+        # The database shares one scratch space, so scans must not overlap across threads
+        with self._trigger_lock:
+            self._trigger_database.scan(lowered.encode(), match_event_handler=on_match)
+        return triggers
+    
+    @staticmethod
+    def _lowercase(prompt: str) -> str:
+        """Lowercase the prompt while keeping every character at its original index"""
+        lowered = prompt.lower()
+        if len(lowered) == len(prompt):
+            return lowered
+        # A few characters such as 'İ' expand when lowercased, which would shift match spans
+        return ''.join(char.lower() if len(char.lower()) == 1 else char for char in prompt)
+    
+    @staticmethod
+    def _compile(patterns: List[str]) -> list:
+        """Compile lowercase patterns"""
+        return [compile_pattern(pattern) for pattern in patterns]
+    
+    @staticmethod
+    def _compile_alternation(patterns: List[str]):
+        """Compile lowercase patterns into one alternation with a capture group each"""
+        return compile_pattern('|'.join(f'(?:{pattern})' for pattern in patterns))
+    
+    @staticmethod
+    def _captured(match, prompt: str) -> str:
+        """Return the original-case text of whichever alternative's group matched"""
+        index = next(index for index, group in enumerate(match.groups(), start=1) if group)
+        return prompt[match.start(index):match.end(index)]
     
     def parse_prompt(self, prompt: str) -> ParsedPrompt:
         """Parse a natural language prompt into structured actions"""
+        return self._parse_cached(prompt)
+    
+    def _parse_prompt(self, prompt: str) -> ParsedPrompt:
+        """Parse a prompt without consulting the cache"""
         logger.info(f"Parsing prompt: {prompt}")
         
         actions = []
         page_name = None
         page_title = None
         target_path = None
+        lowered = self._lowercase(prompt)
+        triggers = self._scan_triggers(lowered)
         
         # Extract page creation
-        page_match = self._extract_page_info(prompt)
+        page_match = self._extract_page_info(prompt, lowered) if 'page' in triggers else None
         if page_match:
             page_name = page_match.get('name')
             page_title = page_match.get('title', page_name)
             actions.append(AEMAction(
                 action_type='create_page',
-                parameters={
+                parameters=MappingProxyType({
                     'page_name': page_name,
                     'page_title': page_title
-                }
+                })
             ))
         
         # Extract navigation path
-        path_match = self._extract_navigation_path(prompt)
+        if 'navigation' in triggers:
+            path_match = self._extract_navigation_path(prompt, lowered)
+        else:
+            path_match = self._DEFAULT_PATH
         if path_match:
             target_path = path_match
         
         # Extract component additions
-        component_matches = self._extract_components(prompt)
+        if 'component' in triggers:
+            component_matches = self._extract_components(prompt, lowered)
+        else:
+            component_matches = self._implied_components(prompt, lowered)
         for component in component_matches:
             actions.append(AEMAction(
                 action_type='add_component',
-                parameters={
+                parameters=MappingProxyType({
                     'component_name': component
-                }
+                })
             ))
         
         # Extract content updates
-        content_matches = self._extract_content(prompt)
+        content_matches = self._extract_content(prompt, lowered) if 'content' in triggers else []
         for content in content_matches:
             actions.append(AEMAction(
                 action_type='edit_content',
-                parameters={
+                parameters=MappingProxyType({
                     'content': content
-                }
+                })
             ))
         
         parsed = ParsedPrompt(
             original_prompt=prompt,
-            actions=actions,
+            actions=tuple(actions),
             target_path=target_path,
             page_name=page_name,
             page_title=page_title
@@ -115,107 +270,80 @@ class PromptParser:
         logger.info(f"Parsed {len(actions)} actions from prompt")
         return parsed
     
-    def _extract_page_info(self, prompt: str) -> Optional[Dict[str, str]]:
+    def _extract_page_info(self, prompt: str, lowered: Optional[str] = None) -> Optional[Dict[str, str]]:
         """Extract page name and title from prompt"""
-        patterns = [
-            r'create.*page.*(?:called|named)\s+["\']?([^"\']+)["\']?',
-            r'make.*new.*page.*["\']?([^"\']+)["\']?',
-            r'add.*page.*["\']?([^"\']+)["\']?'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, prompt, re.IGNORECASE)
-            if match:
-                name = match.group(1).strip()
-                # Convert to URL-friendly format
-                url_name = re.sub(r'[^a-zA-Z0-9\-]', '-', name.lower())
-                return {
-                    'name': url_name,
-                    'title': name
-                }
+        lowered = lowered or self._lowercase(prompt)
+        match = self._page_pattern.search(lowered)
+        if match:
+            name = self._captured(match, prompt).strip()
+            # Convert to URL-friendly format
+            url_name = self._url_unsafe.sub('-', name.lower())
+            return {
+                'name': url_name,
+                'title': name
+            }
         return None
     
-    def _extract_navigation_path(self, prompt: str) -> Optional[List[str]]:
+    def _extract_navigation_path(self, prompt: str, lowered: Optional[str] = None) -> Optional[Sequence[str]]:
         """Extract navigation path from prompt"""
-        patterns = [
-            r'(?:in|under)\s+([^,]+?)(?:\s+folder|\s+directory|,|$)',
-            r'(?:go to|navigate to)\s+([^,]+?)(?:,|$)'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, prompt, re.IGNORECASE)
+        lowered = lowered or self._lowercase(prompt)
+        for pattern in self._navigation_patterns:
+            match = pattern.search(lowered)
             if match:
-                path_str = match.group(1).strip()
+                path_str = self._captured(match, prompt).strip()
                 # Split by common separators and clean up
-                path_segments = [seg.strip() for seg in re.split(r'[>/\\]', path_str) if seg.strip()]
+                path_segments = tuple(seg.strip() for seg in self._path_separator.split(path_str) if seg.strip())
                 return path_segments
         
-        # Default path based on the recording
-        return ['ewp-marketing-websites', 'test-site', 'gl', 'en', 'tax', 'Joseph test']
+        return self._DEFAULT_PATH
     
-    def _extract_components(self, prompt: str) -> List[str]:
+    def _extract_components(self, prompt: str, lowered: Optional[str] = None) -> List[str]:
         """Extract component names from prompt"""
+        lowered = lowered or self._lowercase(prompt)
         components = []
         
-        patterns = [
-            r'add.*(?:an?|the)?\s*([^,]+?)\s*(?:component|element)',
-            r'insert.*(?:an?|the)?\s*([^,]+?)\s*(?:component|element)',
-            r'place.*(?:an?|the)?\s*([^,]+?)\s*(?:component|element)',
-            r'add.*(?:component|element).*["\']?([^"\']+)["\']?',
-            r'insert.*(?:component|element).*["\']?([^"\']+)["\']?',
-            r'place.*(?:component|element).*["\']?([^"\']+)["\']?'
-        ]
-        
-        for pattern in patterns:
-            matches = re.finditer(pattern, prompt, re.IGNORECASE)
-            for match in matches:
-                component_name = match.group(1).strip().lower()
-                # Map to actual AEM component name
-                mapped_component = self.component_mappings.get(component_name, 'Article Paragraph')
-                components.append(mapped_component)
-        
-        # If no specific component mentioned but content is mentioned, assume Article Paragraph
-        if not components and any(word in prompt.lower() for word in ['content', 'text', 'write', 'fill']):
-            components.append('Article Paragraph')
+        # Only the words naming the component count, so 'title' or 'content' elsewhere in the prompt is ignored
+        for phrase in self._component_phrase.finditer(self._quoted.sub(' ', lowered)):
+            # An unknown component name still gets the default component
+            components.extend(self._match_component_synonyms(phrase.group(1)) or ['Article Paragraph'])
+        
+        return components or self._implied_components(prompt, lowered)
+    
+    def _match_component_synonyms(self, text: str) -> List[str]:
+        """Map the known component synonyms in a component noun phrase in a single pass"""
+        if self._component_automaton is None:
+            return [self.component_mappings[match.group(1)] for match in self._component_trie.finditer(text)]
         
+        components = []
+        for end, (length, component) in self._component_automaton.iter_long(text):
+            start = end - length + 1
+            # Only accept whole words, e.g. 'text' but not 'context'
+            if (start > 0 and text[start - 1].isalnum()) or (end + 1 < len(text) and text[end + 1].isalnum()):
+                continue
+            components.append(component)
         return components
     
-    def _extract_content(self, prompt: str) -> List[str]:
+    def _implied_components(self, prompt: str, lowered: Optional[str] = None) -> List[str]:
+        """If no specific component mentioned but content is mentioned, assume Article Paragraph"""
+        lowered = lowered or self._lowercase(prompt)
+        if any(word in lowered for word in ['content', 'text', 'write', 'fill']):
+            return ['Article Paragraph']
+        return []
+    
+    def _extract_content(self, prompt: str, lowered: Optional[str] = None) -> List[str]:
         """Extract content to be added from prompt"""
-        content_list = []
-        
-        patterns = [
-            r'(?:fill|update|edit|change).*(?:with|to)\s+["\']([^"\']+)["\']',
-            r'(?:content|text).*["\']([^"\']+)["\']',
-            r'write\s+["\']([^"\']+)["\']'
-        ]
-        
-        for pattern in patterns:
-            matches = re.finditer(pattern, prompt, re.IGNORECASE)
-            for match in matches:
-                content = match.group(1).strip()
-                content_list.append(content)
-        
-        return content_list
+        lowered = lowered or self._lowercase(prompt)
+        return [self._captured(match, prompt).strip() for match in self._content_pattern.finditer(lowered)]
     
     def generate_execution_plan(self, parsed_prompt: ParsedPrompt) -> List[str]:
         """Generate a human-readable execution plan"""
-        plan = []
-        
-        if parsed_prompt.target_path:
-            plan.append(f"1. Navigate to: {' -> '.join(parsed_prompt.target_path)}")
-        
-        step = 2 if parsed_prompt.target_path else 1
-        
-        for action in parsed_prompt.actions:
-            if action.action_type == 'create_page':
-                plan.append(f"{step}. Create page '{action.parameters['page_name']}' with title '{action.parameters['page_title']}'")
-                step += 1
-            elif action.action_type == 'add_component':
-                plan.append(f"{step}. Add {action.parameters['component_name']} component")
-                step += 1
-            elif action.action_type == 'edit_content':
-                plan.append(f"{step}. Update content with: '{action.parameters['content']}'")
-                step += 1
+        target_path = parsed_prompt.target_path
+        plan = [f"1. Navigate to: {' -> '.join(target_path)}"] if target_path else []
         
+        steps = (
+            self._PLAN_TEMPLATES[action.action_type].format_map(action.parameters)
+            for action in parsed_prompt.actions
+            if action.action_type in self._PLAN_TEMPLATES
+        )
+        plan.extend(f"{step}. {text}" for step, text in enumerate(steps, start=len(plan) + 1))
         return plan
@@ -87,10 +87,65 @@ def test_component_mapping():
         mapped = parser.component_mappings.get(component, "Article Paragraph")
         print(f"'{component}' → '{mapped}'")
 
+def test_component_phrase_scope():
+    """Only the words naming the added component decide which component is added"""
+    parser = PromptParser()
+    
+    expected_components = {
+        # 'title' describes the page, and 'button' is not a known component
+        "Create a page with a title and add a button component": ['Article Paragraph'],
+        # 'text' and 'content' after the component phrase do not add components
+        "Add a title component with some text and content": ['Title'],
+        "Add a Hero Banner component and update it with 'Welcome to our site'": ['Hero Banner'],
+        "Create a page called 'Contact Us', add a title component, and write 'Get in touch with us'": ['Title'],
+        "Insert an image element, then place a heading component": ['Image', 'Title'],
+        # Without an add/insert/place phrase only implied content adds a paragraph
+        "Create a page with a hero banner component": [],
+        "Fill the component with 'This is test content for the automation'": ['Article Paragraph']
+    }
+    
+    for use_automaton in (True, False):
+        if not use_automaton:
+            # Exercise the regex fallback used when pyahocorasick is not installed
+            parser = PromptParser()
+            parser._component_automaton = None
+        
+        for prompt, expected in expected_components.items():
+            parsed = parser.parse_prompt(prompt)
+            components = [
+                action.parameters['component_name']
+                for action in parsed.actions
+                if action.action_type == 'add_component'
+            ]
+            assert components == expected, f"{prompt!r}: expected {expected}, got {components}"
+
+def test_cached_parse_is_read_only():
+    """Test that cached parses cannot be changed by one caller for the next"""
+    parser = PromptParser()
+    prompt = "Create a page called 'About' under Products -> Tax and add a title component"
+    parsed = parser.parse_prompt(prompt)
+    
+    for mutate in (
+        lambda: parsed.actions[0].parameters.update(page_name='Changed'),
+        lambda: parsed.actions.append(parsed.actions[0]),
+        lambda: parsed.target_path.append('Changed'),
+    ):
+        try:
+            mutate()
+        except (AttributeError, TypeError):
+            pass
+        else:
+            raise AssertionError("cached parse result was mutated")
+    
+    assert parser.parse_prompt(prompt) is parsed
+    assert parsed.actions[0].parameters['page_title'] == 'About'
+
 if __name__ == "__main__":
     test_prompt_parsing()
     print("\n" + "=" * 50)
     test_component_mapping()
+    test_component_phrase_scope()
+    test_cached_parse_is_read_only()
     
     print("\n🎉 Parser testing completed!")
     print("\nTo test the full agent, run:")
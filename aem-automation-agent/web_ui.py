@@ -3,29 +3,71 @@ Web UI for AEM Automation Agent
 Provides a user-friendly web interface for interacting with the AEM agent
 """
 
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, Response, render_template, request, jsonify, session
+from flask.json.provider import JSONProvider
 import asyncio
+import gzip
+import itertools
 import threading
 import uuid
+from collections import deque
 from datetime import datetime
 import os
-import json
+import orjson
 from aem_agent import AEMAgent
 from prompt_parser import PromptParser
 from config import settings
 import logging
+from cachetools import TTLCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class ORJSONProvider(JSONProvider):
+    """JSON provider backed by orjson, which also serializes datetimes natively"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
 app.secret_key = os.urandom(24)
+app.json = ORJSONProvider(app)
+
+class SessionCache(TTLCache):
+    """Bounded session store that shuts down agents it evicts or expires"""
+    
+    def popitem(self):
+        key, web_agent = super().popitem()
+        web_agent.shutdown()
+        return key, web_agent
+    
+    def expire(self, time=None):
+        expired = super().expire(time)
+        for _, web_agent in expired:
+            web_agent.shutdown()
+        return expired
 
 # Global variables
-active_sessions = {}
+# Idle sessions are closed after 30 minutes; at most 64 are kept alive
+active_sessions = SessionCache(maxsize=64, ttl=1800)
+sessions_lock = threading.Lock()
 parser = PromptParser()
 
+def get_web_agent():
+    """Return the agent for the current session, refreshing its idle timeout"""
+    session_id = session.get('session_id')
+    if not session_id:
+        return None
+    with sessions_lock:
+        web_agent = active_sessions.get(session_id)
+        if web_agent is not None:
+            active_sessions[session_id] = web_agent
+    return web_agent
+
 class WebAEMAgent:
     """Wrapper for AEMAgent to work with web interface"""
     
@@ -34,8 +76,30 @@ class WebAEMAgent:
         self.agent = None
         self.status = "idle"
         self.current_task = None
-        self.logs = []
-        self.screenshots = []
+        self.logs = deque(maxlen=100)
+        # Log ids only grow, so clients can ask for the entries after the last one they saw
+        self._log_ids = itertools.count(1)
+        self.screenshots = deque(maxlen=50)
+        
+        # One event loop per session keeps the browser usable across requests
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run_loop, daemon=True)
+        self.thread.start()
+    
+    def _run_loop(self):
+        """Run the session's event loop until it is stopped"""
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+        self.loop.close()
+    
+    def submit(self, coro):
+        """Schedule a coroutine on the session's event loop"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+    
+    def shutdown(self):
+        """Clean up the agent, then stop the session's event loop"""
+        future = self.submit(self.cleanup())
+        future.add_done_callback(lambda _: self.loop.call_soon_threadsafe(self.loop.stop))
     
     async def initialize(self):
         """Initialize the AEM agent"""
@@ -87,7 +151,7 @@ class WebAEMAgent:
                 self.add_log("Command executed successfully!", "success")
                 if result.get('screenshot'):
                     self.screenshots.append({
-                        'timestamp': datetime.now().isoformat(),
+                        'timestamp': datetime.now(),
                         'command': command,
                         'path': result['screenshot']
                     })
@@ -107,13 +171,11 @@ class WebAEMAgent:
     def add_log(self, message, level="info"):
         """Add a log entry"""
         self.logs.append({
-            'timestamp': datetime.now().isoformat(),
+            'id': next(self._log_ids),
+            'timestamp': datetime.now(),
             'message': message,
             'level': level
         })
-        # Keep only last 100 logs
-        if len(self.logs) > 100:
-            self.logs = self.logs[-100:]
     
     async def cleanup(self):
         """Clean up the agent"""
@@ -133,7 +195,8 @@ def create_session():
     session['session_id'] = session_id
     
     web_agent = WebAEMAgent(session_id)
-    active_sessions[session_id] = web_agent
+    with sessions_lock:
+        active_sessions[session_id] = web_agent
     
     return jsonify({
         'success': True,
@@ -144,29 +207,20 @@ def create_session():
 @app.route('/api/session/initialize', methods=['POST'])
 def initialize_session():
     """Initialize the AEM agent for the session"""
-    session_id = session.get('session_id')
-    if not session_id or session_id not in active_sessions:
+    web_agent = get_web_agent()
+    if web_agent is None:
         return jsonify({'success': False, 'error': 'No active session'})
     
-    web_agent = active_sessions[session_id]
-    
     # Run initialization in background
-    def init_agent():
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(web_agent.initialize())
-        loop.close()
-    
-    thread = threading.Thread(target=init_agent)
-    thread.start()
+    web_agent.submit(web_agent.initialize())
     
     return jsonify({'success': True, 'message': 'Initialization started'})
 
 @app.route('/api/command/execute', methods=['POST'])
 def execute_command():
     """Execute a natural language command"""
-    session_id = session.get('session_id')
-    if not session_id or session_id not in active_sessions:
+    web_agent = get_web_agent()
+    if web_agent is None:
         return jsonify({'success': False, 'error': 'No active session'})
     
     data = request.get_json()
@@ -175,53 +229,45 @@ def execute_command():
     if not command:
         return jsonify({'success': False, 'error': 'No command provided'})
     
-    web_agent = active_sessions[session_id]
-    
     if web_agent.status != "ready":
         return jsonify({'success': False, 'error': f'Agent not ready (status: {web_agent.status})'})
     
     # Execute command in background
-    def execute_cmd():
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(web_agent.execute_command(command))
-        loop.close()
-    
-    thread = threading.Thread(target=execute_cmd)
-    thread.start()
+    web_agent.submit(web_agent.execute_command(command))
     
     return jsonify({'success': True, 'message': 'Command execution started'})
 
 @app.route('/api/session/status')
 def get_session_status():
     """Get current session status"""
-    session_id = session.get('session_id')
-    if not session_id or session_id not in active_sessions:
+    web_agent = get_web_agent()
+    if web_agent is None:
         return jsonify({'success': False, 'error': 'No active session'})
     
-    web_agent = active_sessions[session_id]
-    
     return jsonify({
         'success': True,
         'status': web_agent.status,
         'current_task': web_agent.current_task,
-        'logs': web_agent.logs[-10:],  # Last 10 logs
-        'screenshots': web_agent.screenshots[-5:]  # Last 5 screenshots
+        'logs': list(web_agent.logs)[-10:],  # Last 10 logs
+        'screenshots': list(web_agent.screenshots)[-5:]  # Last 5 screenshots
     })
 
 @app.route('/api/session/logs')
 def get_session_logs():
-    """Get all session logs"""
-    session_id = session.get('session_id')
-    if not session_id or session_id not in active_sessions:
+    """Get session logs newer than ?since=<id> as NDJSON, one entry per line"""
+    web_agent = get_web_agent()
+    if web_agent is None:
         return jsonify({'success': False, 'error': 'No active session'})
     
-    web_agent = active_sessions[session_id]
+    since = request.args.get('since', 0, type=int)
+    body = b''.join(orjson.dumps(log) + b'\n' for log in list(web_agent.logs) if log['id'] > since)
     
-    return jsonify({
-        'success': True,
-        'logs': web_agent.logs
-    })
+    response = Response(body, mimetype='application/x-ndjson')
+    response.vary.add('Accept-Encoding')
+    if body and 'gzip' in request.accept_encodings:
+        response.set_data(gzip.compress(body))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
 
 @app.route('/api/parser/test', methods=['POST'])
 def test_parser():
@@ -245,7 +291,7 @@ def test_parser():
                 'actions': [
                     {
                         'type': action.action_type,
-                        'parameters': action.parameters
+                        'parameters': dict(action.parameters)
                     }
                     for action in parsed.actions
                 ]
@@ -258,24 +304,16 @@ def test_parser():
 @app.route('/api/session/cleanup', methods=['POST'])
 def cleanup_session():
     """Clean up the current session"""
-    session_id = session.get('session_id')
-    if not session_id or session_id not in active_sessions:
+    web_agent = get_web_agent()
+    if web_agent is None:
         return jsonify({'success': False, 'error': 'No active session'})
     
-    web_agent = active_sessions[session_id]
-    
     # Cleanup in background
-    def cleanup_agent():
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(web_agent.cleanup())
-        loop.close()
-    
-    thread = threading.Thread(target=cleanup_agent)
-    thread.start()
+    web_agent.shutdown()
     
     # Remove from active sessions
-    del active_sessions[session_id]
+    with sessions_lock:
+        active_sessions.pop(web_agent.session_id, None)
     session.pop('session_id', None)
     
     return jsonify({'success': True, 'message': 'Session cleaned up'})
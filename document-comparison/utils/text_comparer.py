@@ -3,242 +3,26 @@ Text comparison module with advanced highlighting functionality.
 """
 
 import difflib
+import functools
 import html
 import re
-from typing import List, Tuple
+from itertools import chain
+from typing import Iterator, List, Sequence, Tuple
 
+import streamlit as st
 
-def compare_texts(text1: str, text2: str, comparison_type: str = "unified") -> str:
-    """
-    Compare two texts and return HTML with highlighted differences.
-    
-    Args:
-        text1 (str): First text to compare
-        text2 (str): Second text to compare
-        comparison_type (str): Type of comparison ('unified', 'side_by_side', 'context')
-        
-    Returns:
-        str: HTML string with highlighted differences
-    """
-    if not text1 and not text2:
-        return "<p>Both texts are empty.</p>"
-    
-    if text1 == text2:
-        return "<div class='match-result'><h3>✅ Documents are identical!</h3></div>"
-    
-    lines1 = text1.splitlines(keepends=True)
-    lines2 = text2.splitlines(keepends=True)
-    
-    if comparison_type == "side_by_side":
-        return _generate_side_by_side_diff(lines1, lines2)
-    elif comparison_type == "context":
-        return _generate_context_diff(lines1, lines2)
-    else:  # unified
-        return _generate_unified_diff(lines1, lines2)
+try:
+    from rapidfuzz.distance import Indel
+except ImportError:
+    Indel = None
 
+try:
+    from diff_match_patch import diff_match_patch
+except ImportError:
+    diff_match_patch = None
 
-def _generate_unified_diff(lines1: List[str], lines2: List[str]) -> str:
-    """Generate unified diff format with color highlighting."""
-    diff = list(difflib.unified_diff(
-        lines1, lines2,
-        fromfile='Document 1',
-        tofile='Document 2',
-        lineterm='',
-        n=3
-    ))
-    
-    if not diff:
-        return "<div class='match-result'><h3>✅ Documents are identical!</h3></div>"
-    
-    html_lines = []
-    html_lines.append(_get_custom_css())
-    html_lines.append("<div class='diff-container'>")
-    html_lines.append("<h3>📄 Document Comparison Results</h3>")
-    html_lines.append("<div class='diff-legend'>")
-    html_lines.append("<span class='legend-item'><span class='legend-add'>+</span> Added lines</span>")
-    html_lines.append("<span class='legend-item'><span class='legend-remove'>-</span> Removed lines</span>")
-    html_lines.append("<span class='legend-item'><span class='legend-context'>@</span> Context</span>")
-    html_lines.append("</div>")
-    html_lines.append("<pre class='diff-content'>")
-    
-    for line in diff:
-        escaped_line = html.escape(line)
-        if line.startswith('+++') or line.startswith('---'):
-            html_lines.append(f"<span class='diff-header'>{escaped_line}</span>")
-        elif line.startswith('@@'):
-            html_lines.append(f"<span class='diff-context'>{escaped_line}</span>")
-        elif line.startswith('+'):
-            html_lines.append(f"<span class='diff-add'>{escaped_line}</span>")
-        elif line.startswith('-'):
-            html_lines.append(f"<span class='diff-remove'>{escaped_line}</span>")
-        else:
-            html_lines.append(f"<span class='diff-normal'>{escaped_line}</span>")
-    
-    html_lines.append("</pre>")
-    html_lines.append("</div>")
-    
-    return '\n'.join(html_lines)
-
-
-def _generate_side_by_side_diff(lines1: List[str], lines2: List[str]) -> str:
-    """Generate side-by-side diff with inline character highlighting."""
-    html_lines = []
-    html_lines.append(_get_custom_css())
-    html_lines.append("<div class='diff-container'>")
-    html_lines.append("<h3>📄 Side-by-Side Document Comparison</h3>")
-    html_lines.append("<div class='side-by-side-container'>")
-    html_lines.append("<div class='side-by-side-header'>")
-    html_lines.append("<div class='left-header'>Document 1</div>")
-    html_lines.append("<div class='right-header'>Document 2</div>")
-    html_lines.append("</div>")
-    
-    # Use SequenceMatcher for more detailed comparison
-    matcher = difflib.SequenceMatcher(None, lines1, lines2)
-    
-    html_lines.append("<div class='side-by-side-content'>")
-    
-    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-        if tag == 'equal':
-            for i in range(i1, i2):
-                left_line = html.escape(lines1[i].rstrip('\n'))
-                right_line = html.escape(lines2[j1 + (i - i1)].rstrip('\n'))
-                html_lines.append(f"<div class='line-pair'>")
-                html_lines.append(f"<div class='left-line normal'>{left_line}</div>")
-                html_lines.append(f"<div class='right-line normal'>{right_line}</div>")
-                html_lines.append(f"</div>")
-        
-        elif tag == 'delete':
-            for i in range(i1, i2):
-                left_line = html.escape(lines1[i].rstrip('\n'))
-                html_lines.append(f"<div class='line-pair'>")
-                html_lines.append(f"<div class='left-line removed'>{left_line}</div>")
-                html_lines.append(f"<div class='right-line empty'></div>")
-                html_lines.append(f"</div>")
-        
-        elif tag == 'insert':
-            for j in range(j1, j2):
-                right_line = html.escape(lines2[j].rstrip('\n'))
-                html_lines.append(f"<div class='line-pair'>")
-                html_lines.append(f"<div class='left-line empty'></div>")
-                html_lines.append(f"<div class='right-line added'>{right_line}</div>")
-                html_lines.append(f"</div>")
-        
-        elif tag == 'replace':
-            max_lines = max(i2 - i1, j2 - j1)
-            for k in range(max_lines):
-                left_line = ""
-                right_line = ""
-                
-                if k < (i2 - i1):
-                    left_line = html.escape(lines1[i1 + k].rstrip('\n'))
-                if k < (j2 - j1):
-                    right_line = html.escape(lines2[j1 + k].rstrip('\n'))
-                
-                # Highlight character-level differences
-                if left_line and right_line:
-                    left_highlighted, right_highlighted = _highlight_char_differences(
-                        lines1[i1 + k].rstrip('\n'), lines2[j1 + k].rstrip('\n')
-                    )
-                    html_lines.append(f"<div class='line-pair'>")
-                    html_lines.append(f"<div class='left-line modified'>{left_highlighted}</div>")
-                    html_lines.append(f"<div class='right-line modified'>{right_highlighted}</div>")
-                    html_lines.append(f"</div>")
-                else:
-                    left_class = "removed" if left_line else "empty"
-                    right_class = "added" if right_line else "empty"
-                    html_lines.append(f"<div class='line-pair'>")
-                    html_lines.append(f"<div class='left-line {left_class}'>{left_line}</div>")
-                    html_lines.append(f"<div class='right-line {right_class}'>{right_line}</div>")
-                    html_lines.append(f"</div>")
-    
-    html_lines.append("</div>")
-    html_lines.append("</div>")
-    html_lines.append("</div>")
-    
-    return '\n'.join(html_lines)
-
-
-def _highlight_char_differences(text1: str, text2: str) -> Tuple[str, str]:
-    """Highlight character-level differences between two strings, including whitespace."""
-    matcher = difflib.SequenceMatcher(None, text1, text2)
-    
-    left_result = []
-    right_result = []
-    
-    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-        if tag == 'equal':
-            left_text = _make_whitespace_visible(text1[i1:i2])
-            right_text = _make_whitespace_visible(text2[j1:j2])
-            left_result.append(html.escape(left_text))
-            right_result.append(html.escape(right_text))
-        elif tag == 'delete':
-            deleted_text = _make_whitespace_visible(text1[i1:i2])
-            left_result.append(f"<span class='char-removed'>{html.escape(deleted_text)}</span>")
-        elif tag == 'insert':
-            inserted_text = _make_whitespace_visible(text2[j1:j2])
-            right_result.append(f"<span class='char-added'>{html.escape(inserted_text)}</span>")
-        elif tag == 'replace':
-            left_text = _make_whitespace_visible(text1[i1:i2])
-            right_text = _make_whitespace_visible(text2[j1:j2])
-            left_result.append(f"<span class='char-modified'>{html.escape(left_text)}</span>")
-            right_result.append(f"<span class='char-modified'>{html.escape(right_text)}</span>")
-    
-    return ''.join(left_result), ''.join(right_result)
-
-
-def _make_whitespace_visible(text: str) -> str:
-    """Make whitespace characters visible for better comparison."""
-    # Replace different types of whitespace with visible symbols
-    text = text.replace(' ', '·')  # Middle dot for spaces
-    text = text.replace('\t', '→')  # Arrow for tabs
-    text = text.replace('\n', '↵\n')  # Return symbol for newlines
-    text = text.replace('\r', '←')  # Left arrow for carriage returns
-    return text
-
-
-def _generate_context_diff(lines1: List[str], lines2: List[str]) -> str:
-    """Generate context diff format."""
-    diff = list(difflib.context_diff(
-        lines1, lines2,
-        fromfile='Document 1',
-        tofile='Document 2',
-        lineterm='',
-        n=3
-    ))
-    
-    if not diff:
-        return "<div class='match-result'><h3>✅ Documents are identical!</h3></div>"
-    
-    html_lines = []
-    html_lines.append(_get_custom_css())
-    html_lines.append("<div class='diff-container'>")
-    html_lines.append("<h3>📄 Context Document Comparison</h3>")
-    html_lines.append("<pre class='diff-content'>")
-    
-    for line in diff:
-        escaped_line = html.escape(line)
-        if line.startswith('***') or line.startswith('---'):
-            html_lines.append(f"<span class='diff-header'>{escaped_line}</span>")
-        elif line.startswith('***************'):
-            html_lines.append(f"<span class='diff-separator'>{escaped_line}</span>")
-        elif line.startswith('+ '):
-            html_lines.append(f"<span class='diff-add'>{escaped_line}</span>")
-        elif line.startswith('- '):
-            html_lines.append(f"<span class='diff-remove'>{escaped_line}</span>")
-        elif line.startswith('! '):
-            html_lines.append(f"<span class='diff-change'>{escaped_line}</span>")
-        else:
-            html_lines.append(f"<span class='diff-normal'>{escaped_line}</span>")
-    
-    html_lines.append("</pre>")
-    html_lines.append("</div>")
-    
-    return '\n'.join(html_lines)
-
-
-def _get_custom_css() -> str:
-    """Return custom CSS for diff highlighting."""
-    return """
+# Styles for every diff view; the app injects them once per page render
+DIFF_CSS = """
     <style>
         .diff-container {
             font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
@@ -396,6 +180,15 @@ def _get_custom_css() -> str:
             font-style: italic;
         }
         
+        .collapsed-lines {
+            padding: 6px 15px;
+            text-align: center;
+            background: #e9ecef;
+            color: #6c757d;
+            font-style: italic;
+            border-bottom: 1px solid #eee;
+        }
+        
         .char-added {
             background: #28a745;
             color: white;
@@ -418,3 +211,376 @@ def _get_custom_css() -> str:
         }
     </style>
     """
+
+IDENTICAL_RESULT_HTML = "<div class='match-result'><h3>✅ Documents are identical!</h3></div>"
+
+# HTML fragments for the diff renderers, built once so the per-line loops only
+# append prebuilt strings and the escaped line text
+_SPAN_CLOSE_NL = "</span>\n"
+_PRE_FOOTER = "</pre>\n</div>"
+_DIFF_HEADER_OPEN = "<span class='diff-header'>"
+_DIFF_NORMAL_OPEN = "<span class='diff-normal'>"
+
+_FILE_HEADER_PREFIXES = frozenset({'+++', '---'})
+_UNIFIED_LINE_OPEN = {
+    '@': "<span class='diff-context'>",
+    '+': "<span class='diff-add'>",
+    '-': "<span class='diff-remove'>",
+}
+_UNIFIED_HEADER = (
+    "<div class='diff-container'>\n"
+    "<h3>📄 Document Comparison Results</h3>\n"
+    "<div class='diff-legend'>\n"
+    "<span class='legend-item'><span class='legend-add'>+</span> Added lines</span>\n"
+    "<span class='legend-item'><span class='legend-remove'>-</span> Removed lines</span>\n"
+    "<span class='legend-item'><span class='legend-context'>@</span> Context</span>\n"
+    "</div>\n"
+    "<pre class='diff-content'>\n"
+)
+
+_CONTEXT_HEADER_PREFIXES = frozenset({'***', '---'})
+_CONTEXT_LINE_OPEN = {
+    '+ ': "<span class='diff-add'>",
+    '- ': "<span class='diff-remove'>",
+    '! ': "<span class='diff-change'>",
+}
+_CONTEXT_HEADER = (
+    "<div class='diff-container'>\n"
+    "<h3>📄 Context Document Comparison</h3>\n"
+    "<pre class='diff-content'>\n"
+)
+
+_LINE_CLASSES = ('normal', 'added', 'removed', 'modified', 'empty')
+_LEFT_OPEN = {cls: f"\n<div class='line-pair'>\n<div class='left-line {cls}'>" for cls in _LINE_CLASSES}
+_RIGHT_OPEN = {cls: f"</div>\n<div class='right-line {cls}'>" for cls in _LINE_CLASSES}
+_PAIR_CLOSE = "</div>\n</div>"
+_SIDE_BY_SIDE_HEADER = (
+    "<div class='diff-container'>\n"
+    "<h3>📄 Side-by-Side Document Comparison</h3>\n"
+    "<div class='side-by-side-container'>\n"
+    "<div class='side-by-side-header'>\n"
+    "<div class='left-header'>Document 1</div>\n"
+    "<div class='right-header'>Document 2</div>\n"
+    "</div>\n"
+    "<div class='side-by-side-content'>"
+)
+_SIDE_BY_SIDE_FOOTER = "\n</div>\n</div>\n</div>"
+_COLLAPSED_LINES = "\n<div class='collapsed-lines'>… {count:,} identical lines …</div>"
+
+# Unchanged lines kept around each change in the side-by-side view, like unified diff's n=3
+SIDE_BY_SIDE_CONTEXT_LINES = 3
+
+_CHAR_REMOVED_OPEN = "<span class='char-removed'>"
+_CHAR_ADDED_OPEN = "<span class='char-added'>"
+_CHAR_MODIFIED_OPEN = "<span class='char-modified'>"
+_SPAN_CLOSE = "</span>"
+
+_WHITESPACE_TABLE = str.maketrans({
+    ' ': '·',  # Middle dot for spaces
+    '\t': '→',  # Arrow for tabs
+    '\n': '↵\n',  # Return symbol for newlines
+    '\r': '←',  # Left arrow for carriage returns
+})
+
+
+def compare_texts(text1: str, text2: str, comparison_type: str = "unified") -> str:
+    """
+    Compare two texts and return HTML with highlighted differences.
+    
+    Results are cached per (text1, text2, comparison_type), so re-running a comparison is instant.
+    
+    Args:
+        text1 (str): First text to compare
+        text2 (str): Second text to compare
+        comparison_type (str): Type of comparison ('unified', 'side_by_side', 'context')
+        
+    Returns:
+        str: HTML string with highlighted differences
+    """
+    return ''.join(iter_compare_texts(text1, text2, comparison_type))
+
+
+def iter_compare_texts(text1: str, text2: str, comparison_type: str = "unified") -> Iterator[str]:
+    """
+    Compare two texts and yield the highlighted HTML in fragments.
+    
+    Unified and context diffs yield one fragment per hunk and side-by-side diffs one per
+    matching block, so callers can start rendering before the whole diff is built.
+    
+    Args:
+        text1 (str): First text to compare
+        text2 (str): Second text to compare
+        comparison_type (str): Type of comparison ('unified', 'side_by_side', 'context')
+        
+    Yields:
+        str: Consecutive fragments of the HTML returned by compare_texts
+    """
+    # Line pairs are memoized within a single comparison only, to bound memory
+    _highlight_char_differences.cache_clear()
+    
+    if not text1 and not text2:
+        yield "<p>Both texts are empty.</p>"
+        return
+    
+    if text1 == text2:
+        yield IDENTICAL_RESULT_HTML
+        return
+    
+    lines1, lines2, ids1, ids2 = _prepare_lines(text1, text2)
+    
+    if comparison_type == "side_by_side":
+        yield from _generate_side_by_side_diff(lines1, lines2, ids1, ids2)
+    elif comparison_type == "context":
+        yield from _generate_context_diff(lines1, lines2)
+    else:  # unified
+        yield from _generate_unified_diff(lines1, lines2)
+
+
+# Lines are only read after preparation, so one shared copy can serve every view mode
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _prepare_lines(text1: str, text2: str) -> Tuple[Tuple[str, ...], Tuple[str, ...], Tuple[int, ...], Tuple[int, ...]]:
+    """
+    Split both texts into interned lines and matching integer line ids.
+    
+    Equal lines in either document share one string object, so difflib's equality
+    checks mostly hit the identity fast path, and one small int shared by both
+    documents, so the side-by-side matcher compares ints instead of strings.
+    """
+    line_ids = {}
+    ids1 = tuple(line_ids.setdefault(line, len(line_ids)) for line in text1.splitlines(keepends=True))
+    ids2 = tuple(line_ids.setdefault(line, len(line_ids)) for line in text2.splitlines(keepends=True))
+    # Dict keys keep insertion order, so position i holds the line with id i
+    pool = tuple(line_ids)
+    return tuple(pool[i] for i in ids1), tuple(pool[i] for i in ids2), ids1, ids2
+
+
+def _generate_unified_diff(lines1: Sequence[str], lines2: Sequence[str]) -> Iterator[str]:
+    """Generate unified diff format with color highlighting, one hunk at a time."""
+    diff = list(difflib.unified_diff(
+        lines1, lines2,
+        fromfile='Document 1',
+        tofile='Document 2',
+        lineterm='',
+        n=3
+    ))
+    
+    if not diff:
+        yield IDENTICAL_RESULT_HTML
+        return
+    
+    html_parts = [_UNIFIED_HEADER]
+    append = html_parts.append
+    
+    for line in diff:
+        if line[:2] == '@@':
+            yield ''.join(html_parts)
+            html_parts.clear()
+        
+        if line[:3] in _FILE_HEADER_PREFIXES:
+            append(_DIFF_HEADER_OPEN)
+        else:
+            append(_UNIFIED_LINE_OPEN.get(line[:1], _DIFF_NORMAL_OPEN))
+        append(html.escape(line))
+        append(_SPAN_CLOSE_NL)
+    
+    append(_PRE_FOOTER)
+    
+    yield ''.join(html_parts)
+
+
+def _generate_side_by_side_diff(
+    lines1: Sequence[str], lines2: Sequence[str], ids1: Sequence[int], ids2: Sequence[int]
+) -> Iterator[str]:
+    """Generate side-by-side diff with inline character highlighting, one block at a time."""
+    html_parts = [_SIDE_BY_SIDE_HEADER]
+    append_pair = html_parts.extend
+    
+    # Match on line ids instead of full line strings; lines1/lines2 are still used for rendering
+    for tag, i1, i2, j1, j2 in _get_opcodes(ids1, ids2):
+        if tag == 'equal':
+            # Long unchanged runs only show their edges, the middle is summarized in one row
+            context = SIDE_BY_SIDE_CONTEXT_LINES
+            hidden = (i2 - i1) - 2 * context
+            visible = chain(range(i1, i1 + context), range(i2 - context, i2)) if hidden > 0 else range(i1, i2)
+            for i in visible:
+                if hidden > 0 and i == i2 - context:
+                    html_parts.append(_COLLAPSED_LINES.format(count=hidden))
+                # Equal ids mean equal lines, so one escaped copy serves both sides
+                line = html.escape(lines1[i].rstrip('\n'))
+                append_pair((_LEFT_OPEN['normal'], line, _RIGHT_OPEN['normal'], line, _PAIR_CLOSE))
+        
+        elif tag == 'delete':
+            for i in range(i1, i2):
+                left_line = html.escape(lines1[i].rstrip('\n'))
+                append_pair((_LEFT_OPEN['removed'], left_line, _RIGHT_OPEN['empty'], '', _PAIR_CLOSE))
+        
+        elif tag == 'insert':
+            for j in range(j1, j2):
+                right_line = html.escape(lines2[j].rstrip('\n'))
+                append_pair((_LEFT_OPEN['empty'], '', _RIGHT_OPEN['added'], right_line, _PAIR_CLOSE))
+        
+        elif tag == 'replace':
+            max_lines = max(i2 - i1, j2 - j1)
+            for k in range(max_lines):
+                left_text = lines1[i1 + k].rstrip('\n') if k < (i2 - i1) else ""
+                right_text = lines2[j1 + k].rstrip('\n') if k < (j2 - j1) else ""
+                
+                if left_text and left_text == right_text:
+                    # Only the line ending differed, so there is nothing to highlight
+                    line = html.escape(left_text)
+                    append_pair((_LEFT_OPEN['normal'], line, _RIGHT_OPEN['normal'], line, _PAIR_CLOSE))
+                elif left_text and right_text:
+                    # Highlight character-level differences
+                    left_highlighted, right_highlighted = _highlight_char_differences(left_text, right_text)
+                    append_pair((_LEFT_OPEN['modified'], left_highlighted, _RIGHT_OPEN['modified'], right_highlighted, _PAIR_CLOSE))
+                else:
+                    left_class = "removed" if left_text else "empty"
+                    right_class = "added" if right_text else "empty"
+                    append_pair((_LEFT_OPEN[left_class], html.escape(left_text), _RIGHT_OPEN[right_class], html.escape(right_text), _PAIR_CLOSE))
+        
+        yield ''.join(html_parts)
+        html_parts.clear()
+    
+    yield _SIDE_BY_SIDE_FOOTER
+
+
+def _get_opcodes(seq1, seq2) -> List[Tuple[str, int, int, int, int]]:
+    """
+    Return difflib-style opcodes for two strings or two lists of interned line ids.
+    
+    Uses RapidFuzz's C++ Indel implementation when available, then a Myers diff from
+    diff_match_patch, and difflib's quadratic-worst-case matcher only as a last resort.
+    """
+    if Indel is not None:
+        return _merge_changes(Indel.opcodes(seq1, seq2))
+    
+    if diff_match_patch is not None:
+        text1, text2 = _as_text(seq1), _as_text(seq2)
+        if text1 is not None and text2 is not None:
+            return _merge_changes(_myers_opcodes(text1, text2))
+    
+    return difflib.SequenceMatcher(None, seq1, seq2).get_opcodes()
+
+
+def _as_text(seq):
+    """Encode a list of line ids as one character per line, as diff_match_patch diffs strings."""
+    if isinstance(seq, str):
+        return seq
+    # Ids must stay below the surrogate range to map to valid characters
+    if max(seq, default=0) >= 0xD800:
+        return None
+    return ''.join(map(chr, seq))
+
+
+def _myers_opcodes(text1: str, text2: str) -> Iterator[Tuple[str, int, int, int, int]]:
+    """Yield equal, delete and insert opcodes from diff_match_patch's Myers diff."""
+    i = j = 0
+    for op, text in diff_match_patch().diff_main(text1, text2, False):
+        size = len(text)
+        if op == diff_match_patch.DIFF_EQUAL:
+            yield ('equal', i, i + size, j, j + size)
+            i += size
+            j += size
+        elif op == diff_match_patch.DIFF_DELETE:
+            yield ('delete', i, i + size, j, j)
+            i += size
+        else:
+            yield ('insert', i, i, j, j + size)
+            j += size
+
+
+def _merge_changes(raw_opcodes) -> List[Tuple[str, int, int, int, int]]:
+    """
+    Merge each run of inserts and deletes between equal blocks into one opcode.
+    
+    Indel and Myers diffs only report inserts and deletes, so this restores the
+    single 'replace' opcode difflib produces for changed blocks.
+    """
+    opcodes = []
+    pending = None
+    for tag, i1, i2, j1, j2 in raw_opcodes:
+        if tag != 'equal':
+            pending = (pending[0], i2, pending[2], j2) if pending else (i1, i2, j1, j2)
+            continue
+        if pending:
+            opcodes.append(_collapse_change(*pending))
+            pending = None
+        opcodes.append((tag, i1, i2, j1, j2))
+    if pending:
+        opcodes.append(_collapse_change(*pending))
+    return opcodes
+
+
+def _collapse_change(i1: int, i2: int, j1: int, j2: int) -> Tuple[str, int, int, int, int]:
+    """Tag a run of changes as replace, delete or insert depending on which sides it touches."""
+    if i1 < i2 and j1 < j2:
+        return ('replace', i1, i2, j1, j2)
+    return ('delete' if i1 < i2 else 'insert', i1, i2, j1, j2)
+
+
+@functools.lru_cache(maxsize=4096)
+def _highlight_char_differences(text1: str, text2: str) -> Tuple[str, str]:
+    """Highlight character-level differences between two strings, including whitespace."""
+    left_result = []
+    right_result = []
+    
+    for tag, i1, i2, j1, j2 in _get_opcodes(text1, text2):
+        if tag == 'equal':
+            left_text = _make_whitespace_visible(text1[i1:i2])
+            right_text = _make_whitespace_visible(text2[j1:j2])
+            left_result.append(html.escape(left_text))
+            right_result.append(html.escape(right_text))
+        elif tag == 'delete':
+            deleted_text = _make_whitespace_visible(text1[i1:i2])
+            left_result.extend((_CHAR_REMOVED_OPEN, html.escape(deleted_text), _SPAN_CLOSE))
+        elif tag == 'insert':
+            inserted_text = _make_whitespace_visible(text2[j1:j2])
+            right_result.extend((_CHAR_ADDED_OPEN, html.escape(inserted_text), _SPAN_CLOSE))
+        elif tag == 'replace':
+            left_text = _make_whitespace_visible(text1[i1:i2])
+            right_text = _make_whitespace_visible(text2[j1:j2])
+            left_result.extend((_CHAR_MODIFIED_OPEN, html.escape(left_text), _SPAN_CLOSE))
+            right_result.extend((_CHAR_MODIFIED_OPEN, html.escape(right_text), _SPAN_CLOSE))
+    
+    return ''.join(left_result), ''.join(right_result)
+
+
+def _make_whitespace_visible(text: str) -> str:
+    """Make whitespace characters visible for better comparison."""
+    # Replace all whitespace types with visible symbols in a single pass
+    return text.translate(_WHITESPACE_TABLE)
+
+
+def _generate_context_diff(lines1: Sequence[str], lines2: Sequence[str]) -> Iterator[str]:
+    """Generate context diff format, one hunk at a time."""
+    diff = list(difflib.context_diff(
+        lines1, lines2,
+        fromfile='Document 1',
+        tofile='Document 2',
+        lineterm='',
+        n=3
+    ))
+    
+    if not diff:
+        yield IDENTICAL_RESULT_HTML
+        return
+    
+    html_parts = [_CONTEXT_HEADER]
+    append = html_parts.append
+    
+    for line in diff:
+        if line == '***************':
+            yield ''.join(html_parts)
+            html_parts.clear()
+        
+        # Hunk separators ('***************') also start with '***' and render as headers
+        if line[:3] in _CONTEXT_HEADER_PREFIXES:
+            append(_DIFF_HEADER_OPEN)
+        else:
+            append(_CONTEXT_LINE_OPEN.get(line[:2], _DIFF_NORMAL_OPEN))
+        append(html.escape(line))
+        append(_SPAN_CLOSE_NL)
+    
+    append(_PRE_FOOTER)
+    
+    yield ''.join(html_parts)
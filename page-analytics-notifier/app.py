@@ -4,16 +4,32 @@ Web interface for managing and monitoring the notification system
 """
 
 import os
+import atexit
+import copy
 import logging
+import pickle
+import shutil
+import threading
 import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from urllib.parse import unquote
 from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 import yaml
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Import our modules
 from modules.excel_processor import ExcelProcessor
-from modules.email_service import EmailService
+from modules.email_service import EmailService, ALERT_DATE_FORMAT
 from modules.stakeholder_mapper import StakeholderMapper
 from modules.database import DatabaseManager
 from modules.scheduler import NotificationScheduler
@@ -34,8 +50,21 @@ app.secret_key = 'your-secret-key-change-this'  # Change this in production
 
 # Configuration
 UPLOAD_FOLDER = 'uploads'
-ALLOWED_EXTENSIONS = {'xlsx', 'xls'}
+ALLOWED_EXTENSIONS = frozenset({'xlsx', 'xls'})
 MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB max file size
+UPLOAD_CHUNK_SIZE = 1 << 20  # Bytes copied per write when streaming uploads
+ANALYSIS_CACHE_SUFFIX = '.analysis.pkl'
+ANALYSIS_CACHE_MAX_AGE = 3600  # Seconds a saved analysis may be reused by send_alerts
+ALERT_RUN_WORKERS = 2  # Alert runs for different files processed concurrently in the background
+ALERT_RUN_HISTORY = 100  # Finished runs kept for status polling
+SMTP_WORKERS = max(1, int(os.environ.get('SMTP_WORKERS', 8)))  # Concurrent email sends per run
+MAX_API_ALERTS = 500  # Upper bound on ?limit= for /api/alerts
+
+# Page field holding the age logged with each alert type
+ALERT_AGE_FIELDS = {
+    'expired': 'page_age_days',
+    'low_engagement': 'days_since_creation'
+}
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
@@ -45,19 +74,84 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs('logs', exist_ok=True)
 os.makedirs('data', exist_ok=True)
 
+# Parsed YAML files keyed by path, invalidated on mtime/size change
+YAML_CACHE_SIZE = 100
+_YAML_CACHE = OrderedDict()
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
 # Initialize components
 db = DatabaseManager()
+atexit.register(db.close)
 scheduler = NotificationScheduler()
+alert_executor = ThreadPoolExecutor(max_workers=ALERT_RUN_WORKERS, thread_name_prefix='alerts')
+_alert_runs = OrderedDict()
+_active_alert_runs = {}  # filename -> run_id of its queued or running alert run
+_alert_runs_lock = threading.RLock()
+
+def save_analysis(filepath, analysis):
+    """Save page analysis next to the upload for send_alerts to reuse"""
+    cache_path = filepath + ANALYSIS_CACHE_SUFFIX
+    try:
+        with open(cache_path + '.tmp', 'wb') as file:
+            pickle.dump(analysis, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(cache_path + '.tmp', cache_path)
+    except Exception as e:
+        logging.warning(f"Could not save analysis for {filepath}: {e}")
+
+def load_analysis(filepath, thresholds):
+    """Load a saved analysis if it is recent, newer than the upload and used the same thresholds"""
+    cache_path = filepath + ANALYSIS_CACHE_SUFFIX
+    try:
+        if not os.path.exists(cache_path):
+            return None
+        
+        cache_mtime = os.path.getmtime(cache_path)
+        if cache_mtime < os.path.getmtime(filepath) or time.time() - cache_mtime > ANALYSIS_CACHE_MAX_AGE:
+            return None
+        
+        with open(cache_path, 'rb') as file:
+            analysis = pickle.load(file)
+        return analysis if analysis['thresholds'] == thresholds else None
+        
+    except Exception as e:
+        logging.warning(f"Ignoring saved analysis for {filepath}: {e}")
+        return None
+
+def json_response(data, status=200):
+    """JSON response for API endpoints, encoded with orjson when installed"""
+    if not ORJSON_AVAILABLE:
+        return jsonify(data), status
+    
+    # Sorted keys match jsonify's key order
+    return app.response_class(orjson.dumps(data, option=orjson.OPT_SORT_KEYS),
+                              status=status, mimetype='application/json')
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    _, dot, extension = filename.rpartition('.')
+    return bool(dot) and extension.lower() in ALLOWED_EXTENSIONS
+
+def load_yaml(path):
+    """Load a YAML file, reusing the parsed result while the file is unchanged"""
+    st = os.stat(path)
+    cached = _YAML_CACHE.get(path)
+    if cached is not None and cached[0] == st.st_mtime and cached[1] == st.st_size:
+        _YAML_CACHE.move_to_end(path)
+        return copy.deepcopy(cached[2])
+    
+    with open(path, 'r') as file:
+        data = yaml.load(file, Loader=_YAML_LOADER)
+    
+    _YAML_CACHE[path] = (st.st_mtime, st.st_size, data)
+    _YAML_CACHE.move_to_end(path)
+    if len(_YAML_CACHE) > YAML_CACHE_SIZE:
+        _YAML_CACHE.popitem(last=False)
+    return copy.deepcopy(data)
 
 def load_config():
     """Load configuration from YAML file"""
     try:
-        with open('config/settings.yaml', 'r') as file:
-            return yaml.safe_load(file)
+        return load_yaml('config/settings.yaml')
     except Exception as e:
         logging.error(f"Error loading config: {e}")
         return {}
@@ -114,6 +208,36 @@ def upload_file():
     
     return render_template('upload.html')
 
+@app.route('/upload/stream', methods=['POST'])
+def upload_stream():
+    """Stream a raw file body to disk without multipart parsing"""
+    original_name = unquote(request.headers.get('X-Filename', ''))
+    if not allowed_file(original_name):
+        return jsonify({'success': False, 'error': 'Invalid file type. Please upload .xlsx or .xls files only.'}), 400
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
+    filename = timestamp + secure_filename(original_name)
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    
+    try:
+        with open(filepath, 'wb') as file:
+            shutil.copyfileobj(request.stream, file, UPLOAD_CHUNK_SIZE)
+    except RequestEntityTooLarge:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        return jsonify({'success': False, 'error': 'File is too large. Maximum size is 50MB.'}), 413
+    except Exception as e:
+        logging.error(f"Error streaming upload: {e}")
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    return jsonify({
+        'success': True,
+        'filename': filename,
+        'process_url': url_for('process_file', filename=filename)
+    })
+
 @app.route('/process/<filename>')
 def process_file(filename):
     """Process uploaded file"""
@@ -145,6 +269,12 @@ def process_file(filename):
             thresholds.get('low_engagement_days', 30),
             thresholds.get('low_engagement_views', 5)
         )
+        save_analysis(filepath, {
+            'thresholds': thresholds,
+            'total_pages': len(processor.data),
+            'expired_pages': expired_pages,
+            'low_engagement_pages': low_engagement_pages
+        })
         
         return render_template('process_results.html',
                              filename=filename,
@@ -158,118 +288,162 @@ def process_file(filename):
         flash(f'Error processing file: {e}', 'error')
         return redirect(url_for('upload_file'))
 
-@app.route('/send_alerts/<filename>', methods=['POST'])
-def send_alerts(filename):
-    """Send email alerts for processed file"""
+def send_alert(email_service, page, alert_type, recipient, alert_date=None):
+    """Send one alert email; returns None if sending raised"""
+    try:
+        if alert_type == 'expired':
+            return email_service.send_expired_page_alert(page, recipient, alert_date)
+        return email_service.send_low_engagement_alert(page, recipient, alert_date)
+    except Exception as e:
+        logging.error(f"Error sending alert for {page['page_url']}: {e}")
+        return None
+
+def deliver_alerts(filename):
+    """Send email alerts for processed file and return the run summary"""
     try:
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         
         if not os.path.exists(filepath):
-            return jsonify({'success': False, 'error': 'File not found'})
+            return {'success': False, 'error': 'File not found'}
         
         start_time = time.time()
         
         # Initialize components
-        processor = ExcelProcessor()
         email_service = EmailService()
         mapper = StakeholderMapper()
         
-        # Process file
-        if not processor.read_excel_file(filepath):
-            return jsonify({'success': False, 'error': 'Error reading Excel file'})
-        
         # Get configuration
         config = load_config()
         thresholds = config.get('thresholds', {})
         
-        # Analyze pages
-        expired_pages, low_engagement_pages = processor.analyze_pages(
-            thresholds.get('expired_page_days', 730),
-            thresholds.get('low_engagement_days', 30),
-            thresholds.get('low_engagement_views', 5)
-        )
+        # Reuse the analysis saved by /process when it is still current
+        analysis = load_analysis(filepath, thresholds)
+        if analysis is not None:
+            expired_pages = analysis['expired_pages']
+            low_engagement_pages = analysis['low_engagement_pages']
+            total_pages = analysis['total_pages']
+        else:
+            # Process file
+            processor = ExcelProcessor()
+            if not processor.read_excel_file(filepath):
+                return {'success': False, 'error': 'Error reading Excel file'}
+            
+            # Analyze pages
+            expired_pages, low_engagement_pages = processor.analyze_pages(
+                thresholds.get('expired_page_days', 730),
+                thresholds.get('low_engagement_days', 30),
+                thresholds.get('low_engagement_views', 5)
+            )
+            total_pages = len(processor.data) if processor.data is not None else 0
         
-        total_pages = len(processor.data) if processor.data is not None else 0
         alerts_generated = 0
         emails_sent = 0
         errors = 0
         
-        # Send expired page alerts
-        for page in expired_pages:
-            try:
-                recipient = mapper.get_stakeholder_email(page['page_url'])
-                
-                # Check if alert was sent recently
-                if db.check_recent_alert(page['page_url'], 'expired', 7):
-                    continue
-                
-                if email_service.send_expired_page_alert(page, recipient):
-                    db.log_alert(
-                        page['page_url'], 'expired', recipient,
-                        page['creation_date'], page['page_views'],
-                        page['page_age_days'], 'sent'
-                    )
-                    emails_sent += 1
-                else:
-                    db.log_alert(
-                        page['page_url'], 'expired', recipient,
-                        page['creation_date'], page['page_views'],
-                        page['page_age_days'], 'failed', 'Email sending failed'
-                    )
-                    errors += 1
-                
-                alerts_generated += 1
-                
-            except Exception as e:
-                logging.error(f"Error sending alert for {page['page_url']}: {e}")
-                errors += 1
-        
-        # Send low engagement alerts
-        for page in low_engagement_pages:
-            try:
-                recipient = mapper.get_stakeholder_email(page['page_url'])
-                
-                # Check if alert was sent recently
-                if db.check_recent_alert(page['page_url'], 'low_engagement', 7):
-                    continue
-                
-                if email_service.send_low_engagement_alert(page, recipient):
-                    db.log_alert(
-                        page['page_url'], 'low_engagement', recipient,
-                        page['creation_date'], page['page_views'],
-                        page['days_since_creation'], 'sent'
-                    )
-                    emails_sent += 1
-                else:
-                    db.log_alert(
-                        page['page_url'], 'low_engagement', recipient,
-                        page['creation_date'], page['page_views'],
-                        page['days_since_creation'], 'failed', 'Email sending failed'
-                    )
-                    errors += 1
-                
-                alerts_generated += 1
-                
-            except Exception as e:
-                logging.error(f"Error sending alert for {page['page_url']}: {e}")
-                errors += 1
+        candidates = []
+        for alert_type, pages in (('expired', expired_pages), ('low_engagement', low_engagement_pages)):
+            for page in pages:
+                candidates.append((page, alert_type, mapper.get_stakeholder_email(page['page_url'])))
+        
+        # Claim pages not alerted recently in one write transaction, so overlapping
+        # runs never alert the same page twice; outcomes are logged in one batch
+        alert_ids = db.claim_alerts([
+            (page['page_url'], alert_type, recipient, page['creation_date'],
+             page['page_views'], page[ALERT_AGE_FIELDS[alert_type]])
+            for page, alert_type, recipient in candidates
+        ], 7)
+        tasks = [task for task, alert_id in zip(candidates, alert_ids) if alert_id is not None]
+        claimed_ids = [alert_id for alert_id in alert_ids if alert_id is not None]
+        outcomes = []
+        
+        # Sends are I/O bound, so fan them out and collect results in task order
+        alert_date = datetime.now().strftime(ALERT_DATE_FORMAT)
+        try:
+            with email_service, ThreadPoolExecutor(max_workers=SMTP_WORKERS) as executor:
+                results = executor.map(lambda task: send_alert(email_service, *task, alert_date), tasks)
+                for alert_id, sent in zip(claimed_ids, results):
+                    if sent is None:
+                        errors += 1
+                        continue
+                    
+                    if sent:
+                        outcomes.append((alert_id, 'sent', None))
+                        emails_sent += 1
+                    else:
+                        outcomes.append((alert_id, 'failed', 'Email sending failed'))
+                        errors += 1
+                    
+                    alerts_generated += 1
+        finally:
+            # Release claims whose send raised or never ran so the next run retries them
+            settled = {alert_id for alert_id, _, _ in outcomes}
+            db.finish_alerts(outcomes, [alert_id for alert_id in claimed_ids if alert_id not in settled])
         
         # Log processing run
         processing_time = time.time() - start_time
         db.log_processing_run(filename, total_pages, alerts_generated, emails_sent, errors, processing_time)
         
-        return jsonify({
+        return {
             'success': True,
             'total_pages': total_pages,
             'alerts_generated': alerts_generated,
             'emails_sent': emails_sent,
             'errors': errors,
             'processing_time': round(processing_time, 2)
-        })
+        }
         
     except Exception as e:
         logging.error(f"Error sending alerts: {e}")
-        return jsonify({'success': False, 'error': str(e)})
+        return {'success': False, 'error': str(e)}
+
+def _set_alert_run(run_id, run):
+    """Record the state of a background alert run"""
+    with _alert_runs_lock:
+        _alert_runs[run_id] = run
+        _alert_runs.move_to_end(run_id)
+        while len(_alert_runs) > ALERT_RUN_HISTORY:
+            _alert_runs.popitem(last=False)
+
+def _run_alert_delivery(run_id, filename):
+    """Background job wrapper around deliver_alerts"""
+    try:
+        result = deliver_alerts(filename)
+        result['run_id'] = run_id
+        result['status'] = 'complete' if result['success'] else 'failed'
+        _set_alert_run(run_id, result)
+    finally:
+        with _alert_runs_lock:
+            _active_alert_runs.pop(filename, None)
+
+@app.route('/send_alerts/<filename>', methods=['POST'])
+def send_alerts(filename):
+    """Queue email alerts for processed file; pass ?wait=1 to send synchronously"""
+    if request.args.get('wait'):
+        return jsonify(deliver_alerts(filename))
+    
+    if not os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], filename)):
+        return jsonify({'success': False, 'error': 'File not found'})
+    
+    # A resubmitted file joins its run in progress rather than queueing another
+    with _alert_runs_lock:
+        run_id = _active_alert_runs.get(filename)
+        if run_id is None:
+            run_id = uuid.uuid4().hex
+            _active_alert_runs[filename] = run_id
+            _set_alert_run(run_id, {'success': True, 'run_id': run_id, 'status': 'running'})
+            alert_executor.submit(_run_alert_delivery, run_id, filename)
+    
+    return jsonify({'success': True, 'run_id': run_id, 'status': 'running'}), 202
+
+@app.route('/send_alerts/status/<run_id>')
+def send_alerts_status(run_id):
+    """Report progress of a queued alert run"""
+    with _alert_runs_lock:
+        run = _alert_runs.get(run_id)
+    
+    if run is None:
+        return jsonify({'success': False, 'error': 'Unknown alert run'}), 404
+    return jsonify(run)
 
 @app.route('/configuration')
 def configuration():
@@ -278,8 +452,7 @@ def configuration():
         config = load_config()
         
         # Load stakeholder configuration
-        with open('config/stakeholders.yaml', 'r') as file:
-            stakeholder_config = yaml.safe_load(file)
+        stakeholder_config = load_yaml('config/stakeholders.yaml')
         
         # Validate stakeholder configuration
         mapper = StakeholderMapper()
@@ -303,8 +476,8 @@ def test_email():
         if not email:
             return jsonify({'success': False, 'error': 'Email address required'})
         
-        email_service = EmailService()
-        success = email_service.send_test_email(email)
+        with EmailService() as email_service:
+            success = email_service.send_test_email(email)
         
         if success:
             return jsonify({'success': True, 'message': 'Test email sent successfully'})
@@ -359,21 +532,21 @@ def api_stats():
     """API endpoint for statistics"""
     try:
         stats = db.get_alert_statistics(30)
-        return jsonify(stats)
+        return json_response(stats)
     except Exception as e:
         logging.error(f"Error getting stats: {e}")
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}, 500)
 
 @app.route('/api/alerts')
 def api_alerts():
     """API endpoint for recent alerts"""
     try:
-        limit = request.args.get('limit', 50, type=int)
+        limit = min(max(request.args.get('limit', 50, type=int), 1), MAX_API_ALERTS)
         alerts = db.get_recent_alerts(limit)
-        return jsonify(alerts)
+        return json_response(alerts)
     except Exception as e:
         logging.error(f"Error getting alerts: {e}")
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}, 500)
 
 @app.route('/api/test-email', methods=['POST'])
 def api_test_email():
@@ -383,19 +556,19 @@ def api_test_email():
         email = data.get('email')
         
         if not email:
-            return jsonify({'success': False, 'error': 'Email address required'})
+            return json_response({'success': False, 'error': 'Email address required'})
         
-        email_service = EmailService()
-        success = email_service.send_test_email(email)
+        with EmailService() as email_service:
+            success = email_service.send_test_email(email)
         
         if success:
-            return jsonify({'success': True, 'message': 'Test email sent successfully'})
+            return json_response({'success': True, 'message': 'Test email sent successfully'})
         else:
-            return jsonify({'success': False, 'error': 'Failed to send test email'})
+            return json_response({'success': False, 'error': 'Failed to send test email'})
             
     except Exception as e:
         logging.error(f"Error sending test email: {e}")
-        return jsonify({'success': False, 'error': str(e)})
+        return json_response({'success': False, 'error': str(e)})
 
 @app.route('/api/validate-stakeholders')
 def api_validate_stakeholders():
@@ -403,10 +576,10 @@ def api_validate_stakeholders():
     try:
         mapper = StakeholderMapper()
         validation_results = mapper.validate_stakeholder_config()
-        return jsonify(validation_results)
+        return json_response(validation_results)
     except Exception as e:
         logging.error(f"Error validating stakeholders: {e}")
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}, 500)
 
 @app.errorhandler(413)
 def too_large(e):
@@ -420,5 +593,6 @@ if __name__ == '__main__':
     if config.get('scheduler', {}).get('enabled', False):
         scheduler.start_scheduler()
     
-    # Run Flask app
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Development server; set FLASK_DEV for the debugger and reloader.
+    # Production runs under gunicorn: gunicorn -c gunicorn.conf.py wsgi:application
+    app.run(debug=bool(os.environ.get('FLASK_DEV')), host='0.0.0.0', port=5000)
@@ -0,0 +1,18 @@
+"""
+Gunicorn configuration for Page Analytics Notification System
+"""
+
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+
+# gevent workers patch sockets, so SMTP sends and slow clients don't block other requests
+worker_class = 'gevent'
+worker_connections = 1000
+
+# The scheduler and queued alert runs live in the worker process; keep one
+# worker unless that state moves out of process
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+timeout = 120
+accesslog = '-'
@@ -4,26 +4,134 @@ Handles SQLite operations for logging and tracking alerts
 """
 
 import sqlite3
+import copy
 import logging
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence, Tuple
 import os
 
+# Applied once to the long-lived connection
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA cache_size=-65536',
+)
+
+# Free pages returned to the filesystem after each cleanup
+VACUUM_PAGES_PER_CLEANUP = 1000
+
+# Seconds dashboard reads are served from memory before re-querying
+READ_CACHE_TTL_SECONDS = 30
+READ_CACHE_MAX_ENTRIES = 32
+
+
 class DatabaseManager:
-    def __init__(self, db_path: str = "data/analytics_notifications.db"):
+    def __init__(self, db_path: str = "data/analytics_notifications.db",
+                 archive_path: Optional[str] = None):
         """Initialize database manager with SQLite database"""
         self.db_path = db_path
+        self.archive_path = archive_path or os.path.join(os.path.dirname(db_path), "archive.db")
+        self._lock = threading.RLock()
+        self._read_cache = {}
+        self._cutoffs = {}
         self.ensure_directory_exists()
+        self._conn = self._connect()
+        self._enable_incremental_vacuum()
         self.init_database()
         
     def ensure_directory_exists(self):
         """Create directory for database if it doesn't exist"""
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open the shared connection used by every method"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+    
+    def _enable_incremental_vacuum(self):
+        """Switch to incremental auto-vacuum; existing files need a one-time VACUUM"""
+        try:
+            with self._connection() as conn:
+                if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+                    conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+                    conn.execute('VACUUM')
+                    logging.info("Enabled incremental auto-vacuum")
+        except Exception as e:
+            logging.warning(f"Could not enable incremental auto-vacuum: {e}")
+    
+    @contextmanager
+    def _connection(self):
+        """Serialize access to the shared connection"""
+        with self._lock:
+            yield self._conn
+    
+    @contextmanager
+    def _transaction(self, immediate: bool = False):
+        """Run the block in a single transaction on the shared connection
+        
+        Immediate transactions take the database write lock up front, so reads
+        inside them cannot be invalidated by another connection's writes.
+        """
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+    
+    def _cutoff_iso(self, days: int) -> str:
+        """ISO timestamp N days ago, reused for up to a second"""
+        now = time.monotonic()
+        cached = self._cutoffs.get(days)
+        if cached is None or cached[0] < now:
+            cached = (now + 1, (datetime.now() - timedelta(days=days)).isoformat())
+            self._cutoffs[days] = cached
+        return cached[1]
+    
+    def _get_cached(self, key):
+        """Return a copy of a cached read result, or None if missing or expired"""
+        with self._lock:
+            entry = self._read_cache.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return copy.deepcopy(entry[1])
+    
+    def _set_cached(self, key, value):
+        """Cache a read result for READ_CACHE_TTL_SECONDS and return a copy of it"""
+        with self._lock:
+            now = time.monotonic()
+            for stale in [k for k, (expires, _) in self._read_cache.items() if expires < now]:
+                del self._read_cache[stale]
+            # Evict the oldest entries once the cache is full
+            self._read_cache.pop(key, None)
+            while len(self._read_cache) >= READ_CACHE_MAX_ENTRIES:
+                del self._read_cache[next(iter(self._read_cache))]
+            self._read_cache[key] = (now + READ_CACHE_TTL_SECONDS, value)
+        return copy.deepcopy(value)
+    
+    def _invalidate_reads(self):
+        """Drop cached reads after the alerts table changes"""
+        with self._lock:
+            self._read_cache.clear()
+    
+    def close(self):
+        """Close the shared connection"""
+        with self._lock:
+            self._conn.close()
         
     def init_database(self):
         """Initialize database tables"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 
                 # Create alerts table
@@ -42,6 +150,20 @@ class DatabaseManager:
                     )
                 ''')
                 
+                # Indexes for recent-alert lookups and newest-first listings
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_alerts_url_type_date
+                    ON alerts (page_url, alert_type, alert_sent_date)
+                ''')
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_alerts_sent_date
+                    ON alerts (alert_sent_date) WHERE email_status = 'sent'
+                ''')
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_alerts_sent_date_desc
+                    ON alerts (alert_sent_date DESC)
+                ''')
+                
                 # Create processing_log table
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS processing_log (
@@ -68,7 +190,6 @@ class DatabaseManager:
                     )
                 ''')
                 
-                conn.commit()
                 logging.info("Database initialized successfully")
                 
         except Exception as e:
@@ -77,10 +198,11 @@ class DatabaseManager:
     
     def log_alert(self, page_url: str, alert_type: str, recipient_email: str, 
                   creation_date: str, page_views: int, page_age_days: Optional[int],
-                  email_status: str, error_message: Optional[str] = None) -> int:
-        """Log an alert to the database"""
+                  email_status: str, error_message: Optional[str] = None,
+                  now_iso: Optional[str] = None) -> int:
+        """Log an alert to the database; pass now_iso to share one timestamp across a run"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO alerts (page_url, alert_type, recipient_email, 
@@ -88,11 +210,11 @@ class DatabaseManager:
                                       alert_sent_date, email_status, error_message)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (page_url, alert_type, recipient_email, creation_date, 
-                      page_views, page_age_days, datetime.now().isoformat(),
+                      page_views, page_age_days, now_iso or datetime.now().isoformat(),
                       email_status, error_message))
                 
                 alert_id = cursor.lastrowid
-                conn.commit()
+                self._invalidate_reads()
                 logging.info(f"Alert logged with ID: {alert_id}")
                 return alert_id
                 
@@ -100,18 +222,93 @@ class DatabaseManager:
             logging.error(f"Error logging alert: {e}")
             raise
     
+    def claim_alerts(self, alerts: List[Tuple], days: int = 7,
+                     now_iso: Optional[str] = None) -> List[Optional[int]]:
+        """Reserve alerts not sent or claimed in the last N days before sending them
+        
+        Each entry is (page_url, alert_type, recipient_email, creation_date,
+        page_views, page_age_days). Claimed alerts are logged as 'pending' in the
+        same write transaction as the check, so overlapping runs cannot both claim
+        a page. Returns the new alert ID for each entry, or None if it was skipped.
+        Settle every claim with finish_alerts once the email has been attempted.
+        """
+        if not alerts:
+            return []
+        
+        try:
+            cutoff_date = self._cutoff_iso(days)
+            sent_date = now_iso or datetime.now().isoformat()
+            alert_ids = []
+            claimed = set()
+            with self._transaction(immediate=True) as conn:
+                cursor = conn.cursor()
+                for alert in alerts:
+                    key = (alert[0], alert[1])
+                    cursor.execute('''
+                        SELECT 1 FROM alerts 
+                        WHERE page_url = ? AND alert_type = ? 
+                        AND alert_sent_date > ? AND email_status IN ('sent', 'pending')
+                        LIMIT 1
+                    ''', (key[0], key[1], cutoff_date))
+                    if key in claimed or cursor.fetchone() is not None:
+                        alert_ids.append(None)
+                        continue
+                    
+                    cursor.execute('''
+                        INSERT INTO alerts (page_url, alert_type, recipient_email, 
+                                          creation_date, page_views, page_age_days,
+                                          alert_sent_date, email_status)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, 'pending')
+                    ''', tuple(alert[:6]) + (sent_date,))
+                    claimed.add(key)
+                    alert_ids.append(cursor.lastrowid)
+            
+            if claimed:
+                self._invalidate_reads()
+            return alert_ids
+            
+        except Exception as e:
+            logging.error(f"Error claiming alerts: {e}")
+            raise
+    
+    def finish_alerts(self, outcomes: List[Tuple], released: Sequence[int] = ()) -> int:
+        """Record the outcome of claimed alerts in a single transaction
+        
+        Each outcome is (alert_id, email_status, error_message). Released claims
+        are deleted, leaving the page free for the next run.
+        """
+        if not outcomes and not released:
+            return 0
+        
+        try:
+            with self._transaction() as conn:
+                conn.executemany('''
+                    UPDATE alerts SET email_status = ?, error_message = ?
+                    WHERE id = ?
+                ''', [(status, error, alert_id) for alert_id, status, error in outcomes])
+                conn.executemany('DELETE FROM alerts WHERE id = ?',
+                                 [(alert_id,) for alert_id in released])
+            self._invalidate_reads()
+            
+            logging.info(f"Logged {len(outcomes)} alerts")
+            return len(outcomes)
+            
+        except Exception as e:
+            logging.error(f"Error logging alerts: {e}")
+            raise
+    
     def check_recent_alert(self, page_url: str, alert_type: str, days: int = 7) -> bool:
         """Check if an alert was sent for this page recently"""
         try:
-            cutoff_date = datetime.now() - timedelta(days=days)
+            cutoff_date = self._cutoff_iso(days)
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT COUNT(*) FROM alerts 
                     WHERE page_url = ? AND alert_type = ? 
                     AND alert_sent_date > ? AND email_status = 'sent'
-                ''', (page_url, alert_type, cutoff_date.isoformat()))
+                ''', (page_url, alert_type, cutoff_date))
                 
                 count = cursor.fetchone()[0]
                 return count > 0
@@ -124,7 +321,7 @@ class DatabaseManager:
                           emails_sent: int, errors: int, processing_time: float) -> int:
         """Log a processing run to the database"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO processing_log (filename, processed_date, total_pages,
@@ -135,7 +332,6 @@ class DatabaseManager:
                       alerts_generated, emails_sent, errors, processing_time))
                 
                 log_id = cursor.lastrowid
-                conn.commit()
                 logging.info(f"Processing run logged with ID: {log_id}")
                 return log_id
                 
@@ -145,41 +341,37 @@ class DatabaseManager:
     
     def get_alert_statistics(self, days: int = 30) -> Dict:
         """Get alert statistics for the last N days"""
+        cached = self._get_cached(('statistics', days))
+        if cached is not None:
+            return cached
+        
         try:
-            cutoff_date = datetime.now() - timedelta(days=days)
+            cutoff_date = self._cutoff_iso(days)
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 
-                # Total alerts
+                # Counts by type and status; the other totals are derived from these
                 cursor.execute('''
-                    SELECT COUNT(*) FROM alerts 
+                    SELECT alert_type, email_status, COUNT(*) FROM alerts 
                     WHERE alert_sent_date > ?
-                ''', (cutoff_date.isoformat(),))
-                total_alerts = cursor.fetchone()[0]
+                    GROUP BY alert_type, email_status
+                ''', (cutoff_date,))
                 
-                # Alerts by type
-                cursor.execute('''
-                    SELECT alert_type, COUNT(*) FROM alerts 
-                    WHERE alert_sent_date > ?
-                    GROUP BY alert_type
-                ''', (cutoff_date.isoformat(),))
-                alerts_by_type = dict(cursor.fetchall())
-                
-                # Success rate
-                cursor.execute('''
-                    SELECT email_status, COUNT(*) FROM alerts 
-                    WHERE alert_sent_date > ?
-                    GROUP BY email_status
-                ''', (cutoff_date.isoformat(),))
-                status_counts = dict(cursor.fetchall())
+                total_alerts = 0
+                alerts_by_type = {}
+                status_counts = {}
+                for alert_type, email_status, count in cursor.fetchall():
+                    total_alerts += count
+                    alerts_by_type[alert_type] = alerts_by_type.get(alert_type, 0) + count
+                    status_counts[email_status] = status_counts.get(email_status, 0) + count
                 
-                return {
+                return self._set_cached(('statistics', days), {
                     'total_alerts': total_alerts,
                     'alerts_by_type': alerts_by_type,
                     'status_counts': status_counts,
                     'period_days': days
-                }
+                })
                 
         except Exception as e:
             logging.error(f"Error getting alert statistics: {e}")
@@ -187,9 +379,14 @@ class DatabaseManager:
     
     def get_recent_alerts(self, limit: int = 50) -> List[Dict]:
         """Get recent alerts for display"""
+        cached = self._get_cached(('recent_alerts', limit))
+        if cached is not None:
+            return cached
+        
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
+                cursor.row_factory = sqlite3.Row
                 cursor.execute('''
                     SELECT page_url, alert_type, recipient_email, alert_sent_date,
                            email_status, page_views, page_age_days
@@ -198,44 +395,56 @@ class DatabaseManager:
                     LIMIT ?
                 ''', (limit,))
                 
-                columns = ['page_url', 'alert_type', 'recipient_email', 
-                          'alert_sent_date', 'email_status', 'page_views', 'page_age_days']
-                
-                alerts = []
-                for row in cursor.fetchall():
-                    alert_dict = dict(zip(columns, row))
-                    alerts.append(alert_dict)
+                alerts = [dict(row) for row in cursor.fetchall()]
                 
-                return alerts
+                return self._set_cached(('recent_alerts', limit), alerts)
                 
         except Exception as e:
             logging.error(f"Error getting recent alerts: {e}")
             return []
     
     def cleanup_old_logs(self, days: int = 90):
-        """Clean up old log entries"""
+        """Move old alerts to the archive database and clean up old log entries"""
         try:
-            cutoff_date = datetime.now() - timedelta(days=days)
+            cutoff_date = self._cutoff_iso(days)
             
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
+            with self._connection() as conn:
+                conn.execute('ATTACH DATABASE ? AS archive', (self.archive_path,))
+                try:
+                    with self._transaction():
+                        cursor = conn.cursor()
+                        
+                        # Archive then remove old alerts
+                        cursor.execute('''
+                            CREATE TABLE IF NOT EXISTS archive.alerts AS
+                            SELECT * FROM main.alerts WHERE 0
+                        ''')
+                        cursor.execute('''
+                            INSERT INTO archive.alerts
+                            SELECT * FROM main.alerts WHERE alert_sent_date < ?
+                        ''', (cutoff_date,))
+                        cursor.execute('''
+                            DELETE FROM main.alerts 
+                            WHERE alert_sent_date < ?
+                        ''', (cutoff_date,))
+                        alerts_deleted = cursor.rowcount
+                        
+                        # Clean up old processing logs
+                        cursor.execute('''
+                            DELETE FROM main.processing_log 
+                            WHERE processed_date < ?
+                        ''', (cutoff_date,))
+                        logs_deleted = cursor.rowcount
+                finally:
+                    conn.execute('DETACH DATABASE archive')
+                self._invalidate_reads()
                 
-                # Clean up old alerts
-                cursor.execute('''
-                    DELETE FROM alerts 
-                    WHERE alert_sent_date < ?
-                ''', (cutoff_date.isoformat(),))
-                alerts_deleted = cursor.rowcount
-                
-                # Clean up old processing logs
-                cursor.execute('''
-                    DELETE FROM processing_log 
-                    WHERE processed_date < ?
-                ''', (cutoff_date.isoformat(),))
-                logs_deleted = cursor.rowcount
+                # Return freed pages to the filesystem and refresh planner statistics;
+                # executescript steps the pragma to completion (execute frees one page)
+                conn.executescript(f'PRAGMA incremental_vacuum({VACUUM_PAGES_PER_CLEANUP});')
+                conn.execute('ANALYZE alerts')
                 
-                conn.commit()
-                logging.info(f"Cleaned up {alerts_deleted} old alerts and {logs_deleted} old processing logs")
+                logging.info(f"Archived {alerts_deleted} old alerts and cleaned up {logs_deleted} old processing logs")
                 
         except Exception as e:
             logging.error(f"Error cleaning up old logs: {e}")
@@ -5,50 +5,139 @@ Handles email sending via SMTP and SendGrid
 
 import smtplib
 import logging
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
+import threading
+import time
+from collections import deque
+from email.message import EmailMessage
 from typing import Dict, List, Optional
 import yaml
 import re
 from datetime import datetime
+from functools import lru_cache
 import os
 
 try:
     from sendgrid import SendGridAPIClient
-    from sendgrid.helpers.mail import Mail
+    from sendgrid.helpers.mail import Mail, Personalization, To
     SENDGRID_AVAILABLE = True
 except ImportError:
     SENDGRID_AVAILABLE = False
     logging.warning("SendGrid not available. Install sendgrid package for SendGrid support.")
 
+# libyaml-backed loader when PyYAML was built with it
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+PLACEHOLDER_PATTERN = re.compile(r'\{\{([^{}]+)\}\}')
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+MAX_EMAIL_LENGTH = 254
+
+ALERT_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+TEMPLATE_DIR = 'config/email_templates'
+TEMPLATE_CHECK_INTERVAL = 6  # Cached template reads between checks for an edited file
+
+SMTP_IDLE_CHECK_SECONDS = 60  # Idle time after which a kept-alive session is checked with NOOP
+RENDER_CACHE_SIZE = 512  # Templates pre-rendered with their page-independent variables, split into segments
+SENDGRID_REQUESTS_PER_SECOND = 10  # Default cap on SendGrid API calls
+SENDGRID_MAX_PERSONALIZATIONS = 1000  # Recipients SendGrid accepts in one request
+
+class EmailSettings:
+    """Settings from the email config section, read once instead of per message"""
+    __slots__ = (
+        'sender_email', 'sender_password', 'sender_name', 'reply_to', 'cc_emails', 'bcc_emails',
+        'smtp_server', 'smtp_port', 'use_tls', 'sendgrid_api_key', 'sendgrid_requests_per_second'
+    )
+    
+    def __init__(self, email_config: Dict):
+        self.sender_email = email_config.get('sender_email')
+        self.sender_password = email_config.get('sender_password')
+        self.sender_name = email_config.get('sender_name', 'Page Analytics System')
+        self.reply_to = email_config.get('reply_to')
+        self.cc_emails = email_config.get('cc_emails', [])
+        self.bcc_emails = email_config.get('bcc_emails', [])
+        self.smtp_server = email_config.get('smtp_server', 'smtp.gmail.com')
+        self.smtp_port = email_config.get('smtp_port', 587)
+        self.use_tls = email_config.get('use_tls', True)
+        self.sendgrid_api_key = email_config.get('sendgrid_api_key')
+        self.sendgrid_requests_per_second = max(1, int(email_config.get('sendgrid_requests_per_second', SENDGRID_REQUESTS_PER_SECOND)))
+
 class EmailService:
     def __init__(self, config_path: str = "config/settings.yaml"):
         """Initialize email service with configuration"""
         self.config = self._load_config(config_path)
         self.email_config = self.config.get('email', {})
+        self.settings = EmailSettings(self.email_config)
         self.template_cache = {}
+        self._preload_templates()
+        self._render_cached = lru_cache(maxsize=RENDER_CACHE_SIZE)(self._render_static)
+        
+        # Template variables shared by every alert of a kind, looked up once
+        thresholds = self.config.get('thresholds', {})
+        self._static_items = {
+            'expired_page': tuple(sorted({
+                'threshold_days': thresholds.get('expired_page_days', 730),
+                'company_name': 'Your Company'
+            }.items())),
+            'low_engagement': tuple(sorted({
+                'threshold_days': thresholds.get('low_engagement_days', 30),
+                'min_views': thresholds.get('low_engagement_views', 5),
+                'company_name': 'Your Company'
+            }.items()))
+        }
+        
+        # One SMTP session per sending thread, reused across messages
+        self._smtp_local = threading.local()
+        self._smtp_sessions = []
+        self._smtp_lock = threading.Lock()
+        
+        # Start times of recent SendGrid requests, for rate limiting
+        self._sendgrid_requests = deque()
+        self._sendgrid_lock = threading.Lock()
         
     def _load_config(self, config_path: str) -> Dict:
         """Load configuration from YAML file"""
         try:
             with open(config_path, 'r') as file:
-                return yaml.safe_load(file)
+                return yaml.load(file, Loader=_YAML_LOADER)
         except Exception as e:
             logging.error(f"Error loading config: {e}")
             return {}
     
+    def _preload_templates(self):
+        """Read every email template up front so the first alert of each kind skips disk"""
+        try:
+            template_files = [f for f in os.listdir(TEMPLATE_DIR) if f.endswith('.html')]
+        except OSError as e:
+            logging.warning(f"Could not preload email templates: {e}")
+            return
+        
+        for template_file in template_files:
+            self._load_template(template_file[:-len('.html')])
+    
     def _load_template(self, template_name: str) -> str:
-        """Load email template from file"""
-        if template_name in self.template_cache:
-            return self.template_cache[template_name]
+        """Load email template from file, re-reading it if the file has changed"""
+        template_path = os.path.join(TEMPLATE_DIR, f"{template_name}.html")
+        
+        # Entries are (content, mtime, reads since the last mtime check)
+        cached = self.template_cache.get(template_name)
+        if cached is not None:
+            template_content, mtime, reads = cached
+            if reads + 1 < TEMPLATE_CHECK_INTERVAL:
+                self.template_cache[template_name] = (template_content, mtime, reads + 1)
+                return template_content
+            
+            try:
+                unchanged = os.path.getmtime(template_path) == mtime
+            except OSError:
+                unchanged = True  # Keep serving the cached copy if the file went away
+            if unchanged:
+                self.template_cache[template_name] = (template_content, mtime, 0)
+                return template_content
         
-        template_path = f"config/email_templates/{template_name}.html"
         try:
+            mtime = os.path.getmtime(template_path)
             with open(template_path, 'r', encoding='utf-8') as file:
                 template_content = file.read()
-                self.template_cache[template_name] = template_content
+                self.template_cache[template_name] = (template_content, mtime, 0)
                 return template_content
         except Exception as e:
             logging.error(f"Error loading template {template_name}: {e}")
@@ -57,24 +146,39 @@ class EmailService:
     def _render_template(self, template_content: str, variables: Dict) -> str:
         """Render template with variables"""
         try:
-            # Simple template rendering using string replacement
-            rendered = template_content
-            for key, value in variables.items():
-                placeholder = f"{{{{{key}}}}}"
-                rendered = rendered.replace(placeholder, str(value))
+            # Substitute every {{key}} in one pass; unknown placeholders are left as-is
+            def substitute(match):
+                key = match.group(1)
+                return str(variables[key]) if key in variables else match.group(0)
             
-            return rendered
+            return PLACEHOLDER_PATTERN.sub(substitute, template_content)
         except Exception as e:
             logging.error(f"Error rendering template: {e}")
             return template_content
     
+    def _render_static(self, template_content: str, items_tuple: tuple) -> tuple:
+        """Render the variables shared by every alert into a template and split it into segments"""
+        # Alternating static text and placeholder names: [text, key, text, key, ..., text]
+        return tuple(PLACEHOLDER_PATTERN.split(self._render_template(template_content, dict(items_tuple))))
+    
+    def _render_segments(self, segments: tuple, variables: Dict) -> str:
+        """Fill the placeholder slots of a split template; unknown placeholders are left as-is"""
+        parts = list(segments)
+        for i in range(1, len(parts), 2):
+            key = parts[i]
+            parts[i] = str(variables[key]) if key in variables else '{{' + key + '}}'
+        return ''.join(parts)
+    
     def _validate_email(self, email: str) -> bool:
         """Validate email address format"""
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return bool(re.match(pattern, email))
+        # Cheap rejects (no local part or domain, over the 254-character limit) skip the regex
+        at = email.find('@')
+        if at <= 0 or at == len(email) - 1 or len(email) > MAX_EMAIL_LENGTH:
+            return False
+        return EMAIL_PATTERN.match(email) is not None
     
-    def send_expired_page_alert(self, page_data: Dict, recipient_email: str) -> bool:
-        """Send expired page alert email"""
+    def send_expired_page_alert(self, page_data: Dict, recipient_email: str, alert_date: Optional[str] = None) -> bool:
+        """Send expired page alert email; batch senders pass one alert_date for the whole run"""
         try:
             if not self._validate_email(recipient_email):
                 logging.error(f"Invalid email address: {recipient_email}")
@@ -87,9 +191,7 @@ class EmailService:
                 'page_views': page_data['page_views'],
                 'page_age_days': page_data['page_age_days'],
                 'page_age_years': page_data['page_age_years'],
-                'alert_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'threshold_days': self.config.get('thresholds', {}).get('expired_page_days', 730),
-                'company_name': 'Your Company',
+                'alert_date': alert_date or datetime.now().strftime(ALERT_DATE_FORMAT),
                 'aem_edit_url': f"https://author.aem.company.com{page_data['page_url']}",
                 'analytics_url': f"https://analytics.adobe.com/workspace/project/page-analysis?url={page_data['page_url']}"
             }
@@ -100,7 +202,9 @@ class EmailService:
                 logging.error("Failed to load expired page template")
                 return False
             
-            html_content = self._render_template(template_content, variables)
+            # Shared variables are rendered once per template version and cached
+            segments = self._render_cached(template_content, self._static_items['expired_page'])
+            html_content = self._render_segments(segments, variables)
             
             # Send email
             subject = f"🚨 Page Review Required - Expired Content: {page_data['page_url']}"
@@ -110,8 +214,8 @@ class EmailService:
             logging.error(f"Error sending expired page alert: {e}")
             return False
     
-    def send_low_engagement_alert(self, page_data: Dict, recipient_email: str) -> bool:
-        """Send low engagement alert email"""
+    def send_low_engagement_alert(self, page_data: Dict, recipient_email: str, alert_date: Optional[str] = None) -> bool:
+        """Send low engagement alert email; batch senders pass one alert_date for the whole run"""
         try:
             if not self._validate_email(recipient_email):
                 logging.error(f"Invalid email address: {recipient_email}")
@@ -124,10 +228,7 @@ class EmailService:
                 'page_views': page_data['page_views'],
                 'days_since_creation': page_data['days_since_creation'],
                 'expected_views': page_data['expected_views'],
-                'alert_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'threshold_days': self.config.get('thresholds', {}).get('low_engagement_days', 30),
-                'min_views': self.config.get('thresholds', {}).get('low_engagement_views', 5),
-                'company_name': 'Your Company',
+                'alert_date': alert_date or datetime.now().strftime(ALERT_DATE_FORMAT),
                 'aem_edit_url': f"https://author.aem.company.com{page_data['page_url']}",
                 'analytics_url': f"https://analytics.adobe.com/workspace/project/page-analysis?url={page_data['page_url']}"
             }
@@ -138,7 +239,9 @@ class EmailService:
                 logging.error("Failed to load low engagement template")
                 return False
             
-            html_content = self._render_template(template_content, variables)
+            # Shared variables are rendered once per template version and cached
+            segments = self._render_cached(template_content, self._static_items['low_engagement'])
+            html_content = self._render_segments(segments, variables)
             
             # Send email
             subject = f"📊 Low Engagement Alert - New Page Performance: {page_data['page_url']}"
@@ -151,7 +254,7 @@ class EmailService:
     def _send_email(self, recipient_email: str, subject: str, html_content: str) -> bool:
         """Send email using configured method"""
         # Try SendGrid first if available and configured
-        if SENDGRID_AVAILABLE and self.email_config.get('sendgrid_api_key'):
+        if SENDGRID_AVAILABLE and self.settings.sendgrid_api_key:
             return self._send_via_sendgrid(recipient_email, subject, html_content)
         
         # Fallback to SMTP
@@ -160,9 +263,10 @@ class EmailService:
     def _send_via_smtp(self, recipient_email: str, subject: str, html_content: str) -> bool:
         """Send email via SMTP"""
         try:
-            sender_email = self.email_config.get('sender_email')
-            sender_password = self.email_config.get('sender_password')
-            sender_name = self.email_config.get('sender_name', 'Page Analytics System')
+            settings = self.settings
+            sender_email = settings.sender_email
+            sender_password = settings.sender_password
+            sender_name = settings.sender_name
             
             if not sender_email or not sender_password:
                 logging.error("SMTP credentials not configured")
@@ -175,41 +279,44 @@ class EmailService:
                 return False
             
             # Create message
-            msg = MIMEMultipart('alternative')
+            msg = EmailMessage()
             msg['Subject'] = subject
             msg['From'] = f"{sender_name} <{sender_email}>"
             msg['To'] = recipient_email
             
             # Add Reply-To if configured
-            reply_to = self.email_config.get('reply_to')
+            reply_to = settings.reply_to
             if reply_to:
                 msg['Reply-To'] = reply_to
             
             # Add CC emails if configured
-            cc_emails = self.email_config.get('cc_emails', [])
+            cc_emails = settings.cc_emails
             if cc_emails:
                 msg['Cc'] = ', '.join(cc_emails)
             
             # Add BCC emails if configured
-            bcc_emails = self.email_config.get('bcc_emails', [])
+            bcc_emails = settings.bcc_emails
             
-            # Add HTML content
-            html_part = MIMEText(html_content, 'html')
-            msg.attach(html_part)
+            # Single text/html body; quoted-printable keeps mostly-ASCII HTML near its raw size
+            msg.set_content(html_content, subtype='html', cte='quoted-printable')
             
             # Prepare recipient list (including CC and BCC)
             all_recipients = [recipient_email] + cc_emails + bcc_emails
             
             # Send email
-            smtp_server = self.email_config.get('smtp_server', 'smtp.gmail.com')
-            smtp_port = self.email_config.get('smtp_port', 587)
-            use_tls = self.email_config.get('use_tls', True)
-            
-            with smtplib.SMTP(smtp_server, smtp_port) as server:
-                if use_tls:
-                    server.starttls()
-                server.login(sender_email, sender_password)
-                server.send_message(msg, to_addrs=all_recipients)
+            try:
+                server = self._get_smtp_session(sender_email, sender_password)
+                try:
+                    server.send_message(msg, to_addrs=all_recipients)
+                except smtplib.SMTPServerDisconnected:
+                    # Server dropped the kept-alive session; redial once
+                    self._drop_smtp_session()
+                    server = self._get_smtp_session(sender_email, sender_password)
+                    server.send_message(msg, to_addrs=all_recipients)
+            except (smtplib.SMTPServerDisconnected, OSError):
+                self._drop_smtp_session()
+                raise
+            self._smtp_local.last_used = time.monotonic()
             
             logging.info(f"Email sent successfully via SMTP to {recipient_email} (CC: {cc_emails}, BCC: {bcc_emails})")
             return True
@@ -218,12 +325,88 @@ class EmailService:
             logging.error(f"Error sending email via SMTP: {e}")
             return False
     
+    def _get_smtp_session(self, sender_email: str, sender_password: str) -> smtplib.SMTP:
+        """Return this thread's logged-in SMTP session, dialing if needed"""
+        server = getattr(self._smtp_local, 'server', None)
+        
+        # Probe sessions that sat idle long enough for the server to time them out
+        if server is not None and time.monotonic() - self._smtp_local.last_used > SMTP_IDLE_CHECK_SECONDS:
+            try:
+                server.noop()
+            except (smtplib.SMTPException, OSError):
+                self._drop_smtp_session()
+                server = None
+        
+        if server is None:
+            server = smtplib.SMTP(self.settings.smtp_server, self.settings.smtp_port)
+            try:
+                if self.settings.use_tls:
+                    server.starttls()
+                server.login(sender_email, sender_password)
+            except Exception:
+                server.close()
+                raise
+            
+            self._smtp_local.server = server
+            self._smtp_local.last_used = time.monotonic()
+            with self._smtp_lock:
+                self._smtp_sessions.append(server)
+        
+        return server
+    
+    def _drop_smtp_session(self):
+        """Discard this thread's SMTP session"""
+        server = getattr(self._smtp_local, 'server', None)
+        if server is None:
+            return
+        
+        self._smtp_local.server = None
+        with self._smtp_lock:
+            if server in self._smtp_sessions:
+                self._smtp_sessions.remove(server)
+        server.close()
+    
+    def close(self):
+        """Close every SMTP session opened by this service"""
+        with self._smtp_lock:
+            sessions, self._smtp_sessions = self._smtp_sessions, []
+        
+        for server in sessions:
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                server.close()
+        self._smtp_local = threading.local()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+    
+    def _throttle_sendgrid(self):
+        """Wait until another SendGrid request fits within the rate limit"""
+        limit = self.settings.sendgrid_requests_per_second
+        while True:
+            with self._sendgrid_lock:
+                now = time.monotonic()
+                while self._sendgrid_requests and now - self._sendgrid_requests[0] >= 1:
+                    self._sendgrid_requests.popleft()
+                
+                if len(self._sendgrid_requests) < limit:
+                    self._sendgrid_requests.append(now)
+                    return
+                
+                wait = 1 - (now - self._sendgrid_requests[0])
+            time.sleep(wait)
+    
     def _send_via_sendgrid(self, recipient_email: str, subject: str, html_content: str) -> bool:
         """Send email via SendGrid"""
         try:
-            api_key = self.email_config.get('sendgrid_api_key')
-            sender_email = self.email_config.get('sender_email')
-            sender_name = self.email_config.get('sender_name', 'Page Analytics System')
+            api_key = self.settings.sendgrid_api_key
+            sender_email = self.settings.sender_email
+            sender_name = self.settings.sender_name
             
             if not api_key or not sender_email:
                 logging.error("SendGrid credentials not configured")
@@ -237,6 +420,7 @@ class EmailService:
             )
             
             sg = SendGridAPIClient(api_key=api_key)
+            self._throttle_sendgrid()
             response = sg.send(message)
             
             if response.status_code in [200, 201, 202]:
@@ -250,6 +434,49 @@ class EmailService:
             logging.error(f"Error sending email via SendGrid: {e}")
             return False
     
+    def _send_batch_via_sendgrid(self, recipient_emails: List[str], subject: str, html_content: str) -> int:
+        """Send one message to many recipients via SendGrid, returning how many were accepted"""
+        try:
+            api_key = self.settings.sendgrid_api_key
+            sender_email = self.settings.sender_email
+            sender_name = self.settings.sender_name
+            
+            if not api_key or not sender_email:
+                logging.error("SendGrid credentials not configured")
+                return 0
+            
+            sg = SendGridAPIClient(api_key=api_key)
+            accepted = 0
+            
+            for start in range(0, len(recipient_emails), SENDGRID_MAX_PERSONALIZATIONS):
+                batch = recipient_emails[start:start + SENDGRID_MAX_PERSONALIZATIONS]
+                message = Mail(
+                    from_email=(sender_email, sender_name),
+                    subject=subject,
+                    html_content=html_content
+                )
+                
+                # One personalization per recipient so nobody sees the other addresses
+                for email in batch:
+                    personalization = Personalization()
+                    personalization.add_to(To(email))
+                    message.add_personalization(personalization)
+                
+                self._throttle_sendgrid()
+                response = sg.send(message)
+                
+                if response.status_code in [200, 201, 202]:
+                    logging.info(f"Email sent successfully via SendGrid to {len(batch)} recipients")
+                    accepted += len(batch)
+                else:
+                    logging.error(f"SendGrid error: {response.status_code}")
+            
+            return accepted
+            
+        except Exception as e:
+            logging.error(f"Error sending batch email via SendGrid: {e}")
+            return 0
+    
     def send_test_email(self, recipient_email: str) -> bool:
         """Send a test email to verify configuration"""
         try:
@@ -296,6 +523,14 @@ class EmailService:
             </html>
             """
             
+            if not recipient_emails:
+                return False
+            
+            # Every recipient gets the same HTML, so SendGrid takes them in one request
+            if SENDGRID_AVAILABLE and self.settings.sendgrid_api_key:
+                return self._send_batch_via_sendgrid(recipient_emails, subject, html_content) > 0
+            
+            # SMTP stays serial on the caller's session; worker threads would each log in and leave a session open
             success_count = 0
             for email in recipient_emails:
                 if self._send_email(email, subject, html_content):
@@ -10,6 +10,23 @@ from typing import List, Dict, Tuple, Optional
 import os
 import re
 
+try:
+    import xlsxwriter
+    XLSXWRITER_AVAILABLE = True
+except ImportError:
+    XLSXWRITER_AVAILABLE = False
+
+# Cleaned data is pickled next to the workbook so repeat reads skip parsing
+PARSED_CACHE_SUFFIX = '.pkl'
+
+URL_PATTERN = re.compile(
+    r'^https?://'  # http:// or https://
+    r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'  # domain...
+    r'localhost|'  # localhost...
+    r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'  # ...or ip
+    r'(?::\d+)?'  # optional port
+    r'(?:/?|[/?]\S+)$', re.IGNORECASE)
+
 class ExcelProcessor:
     def __init__(self):
         """Initialize Excel processor"""
@@ -31,31 +48,42 @@ class ExcelProcessor:
     
     def read_excel_file(self, file_path: str) -> bool:
         """Read Excel file and validate structure"""
+        cache_path = file_path + PARSED_CACHE_SUFFIX
+        if self._load_parsed_cache(file_path, cache_path):
+            return True
+        
         try:
-            # Try reading the Excel file
-            self.data = pd.read_excel(file_path)
+            # Only parse columns that can map to a required column
+            self.data = pd.read_excel(file_path, usecols=self._is_candidate_column)
             logging.info(f"Successfully read Excel file: {file_path}")
             
-            # Validate required columns
+            # Validate required columns, lower-casing each report column name once
+            lowered = [(str(c).lower(), c) for c in self.data.columns if c not in self.required_columns]
+            renames = {}
             missing_columns = []
             for col in self.required_columns:
                 # Check for exact match or similar column names
                 if col not in self.data.columns:
-                    # Try to find similar column names (case insensitive)
-                    similar_cols = [c for c in self.data.columns if col.lower() in c.lower()]
+                    # Prefer a case-insensitive exact name, then the first name containing it
+                    target = col.lower()
+                    similar_cols = ([c for name, c in lowered if name == target and c not in renames]
+                                    or [c for name, c in lowered if target in name and c not in renames])
                     if similar_cols:
-                        # Use the first similar column found
-                        self.data.rename(columns={similar_cols[0]: col}, inplace=True)
+                        renames[similar_cols[0]] = col
                         logging.info(f"Mapped column '{similar_cols[0]}' to '{col}'")
                     else:
                         missing_columns.append(col)
             
+            if renames:
+                self.data.rename(columns=renames, inplace=True)
+            
             if missing_columns:
                 logging.error(f"Missing required columns: {missing_columns}")
                 return False
             
             # Clean and validate data
             self._clean_data()
+            self._save_parsed_cache(cache_path)
             
             logging.info(f"Excel file processed successfully. Found {len(self.data)} rows")
             return True
@@ -64,6 +92,36 @@ class ExcelProcessor:
             logging.error(f"Error reading Excel file: {e}")
             return False
     
+    def _is_candidate_column(self, column) -> bool:
+        """Whether a column name matches, or contains, a required column name"""
+        name = str(column).lower()
+        return any(col.lower() in name for col in self.required_columns)
+    
+    def _load_parsed_cache(self, file_path: str, cache_path: str) -> bool:
+        """Load previously cleaned data if it is newer than the workbook"""
+        try:
+            if not os.path.exists(cache_path) or os.path.getmtime(cache_path) < os.path.getmtime(file_path):
+                return False
+            
+            self.data = pd.read_pickle(cache_path)
+            self._compute_ages()
+            logging.info(f"Loaded parsed data from cache: {cache_path} ({len(self.data)} rows)")
+            return True
+            
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable parse cache {cache_path}: {e}")
+            return False
+    
+    def _save_parsed_cache(self, cache_path: str):
+        """Persist cleaned data for later reads of the same workbook"""
+        try:
+            temp_path = cache_path + '.tmp'
+            self.data.to_pickle(temp_path)
+            os.replace(temp_path, cache_path)
+            
+        except Exception as e:
+            logging.warning(f"Could not write parse cache {cache_path}: {e}")
+    
     def _clean_data(self):
         """Clean and validate the data"""
         try:
@@ -83,8 +141,10 @@ class ExcelProcessor:
             # Remove rows where date conversion failed
             self.data = self.data.dropna(subset=['Creation Date'])
             
-            # Remove duplicate URLs (keep the latest entry)
-            self.data = self.data.sort_values('Creation Date').drop_duplicates(subset=['Page URL'], keep='last')
+            # Remove duplicate URLs (keep the latest entry) without sorting the whole frame
+            latest_rows = self.data.groupby('Page URL', sort=False)['Creation Date'].idxmax()
+            self.data = self.data.loc[latest_rows].reset_index(drop=True)
+            self._compute_ages()
             
             final_count = len(self.data)
             logging.info(f"Data cleaned: {initial_count} -> {final_count} rows")
@@ -93,6 +153,10 @@ class ExcelProcessor:
             logging.error(f"Error cleaning data: {e}")
             raise
     
+    def _compute_ages(self):
+        """Store each page's age in days, shared by the analysis and the summary"""
+        self.data['age_days'] = (datetime.now() - self.data['Creation Date']).dt.days.astype('int32')
+    
     def analyze_pages(self, expired_threshold_days: int = 730, 
                      low_engagement_days: int = 30, 
                      low_engagement_views: int = 5) -> Tuple[List[Dict], List[Dict]]:
@@ -101,40 +165,40 @@ class ExcelProcessor:
             logging.error("No data loaded. Please read Excel file first.")
             return [], []
         
-        current_date = datetime.now()
-        expired_pages = []
-        low_engagement_pages = []
-        
         try:
-            for _, row in self.data.iterrows():
-                page_url = row['Page URL']
-                creation_date = row['Creation Date']
-                page_views = int(row['Page Views'])
-                
-                # Calculate page age
-                page_age = (current_date - creation_date).days
-                
-                # Check for expired pages
-                if page_age > expired_threshold_days:
-                    expired_pages.append({
-                        'page_url': page_url,
-                        'creation_date': creation_date.strftime('%Y-%m-%d'),
-                        'page_views': page_views,
-                        'page_age_days': page_age,
-                        'page_age_years': round(page_age / 365.25, 1),
-                        'alert_type': 'expired'
-                    })
-                
-                # Check for low engagement pages (recently created)
-                elif page_age <= low_engagement_days and page_views < low_engagement_views:
-                    low_engagement_pages.append({
-                        'page_url': page_url,
-                        'creation_date': creation_date.strftime('%Y-%m-%d'),
-                        'page_views': page_views,
-                        'days_since_creation': page_age,
-                        'expected_views': low_engagement_views,
-                        'alert_type': 'low_engagement'
-                    })
+            page_ages = self.data['age_days']
+            page_views = self.data['Page Views'].astype('int64')
+            
+            # Expired pages take precedence over low engagement
+            expired_mask = page_ages > expired_threshold_days
+            low_engagement_mask = (~expired_mask & (page_ages <= low_engagement_days)
+                                   & (page_views < low_engagement_views))
+            
+            # Check for expired pages
+            expired_pages = [
+                {
+                    'page_url': page_url,
+                    'creation_date': creation_date,
+                    'page_views': views,
+                    'page_age_days': page_age,
+                    'page_age_years': round(page_age / 365.25, 1),
+                    'alert_type': 'expired'
+                }
+                for page_url, creation_date, views, page_age in self._masked_rows(expired_mask, page_views, page_ages)
+            ]
+            
+            # Check for low engagement pages (recently created)
+            low_engagement_pages = [
+                {
+                    'page_url': page_url,
+                    'creation_date': creation_date,
+                    'page_views': views,
+                    'days_since_creation': page_age,
+                    'expected_views': low_engagement_views,
+                    'alert_type': 'low_engagement'
+                }
+                for page_url, creation_date, views, page_age in self._masked_rows(low_engagement_mask, page_views, page_ages)
+            ]
             
             logging.info(f"Analysis complete: {len(expired_pages)} expired pages, {len(low_engagement_pages)} low engagement pages")
             return expired_pages, low_engagement_pages
@@ -143,32 +207,42 @@ class ExcelProcessor:
             logging.error(f"Error analyzing pages: {e}")
             return [], []
     
+    def _masked_rows(self, mask: pd.Series, page_views: pd.Series, page_ages: pd.Series):
+        """Iterate (url, creation date, views, age) as plain Python values for rows in mask"""
+        selected = self.data.loc[mask]
+        return zip(
+            selected['Page URL'].tolist(),
+            selected['Creation Date'].dt.strftime('%Y-%m-%d').tolist(),
+            page_views[mask].tolist(),
+            page_ages[mask].tolist()
+        )
+    
     def get_data_summary(self) -> Dict:
         """Get summary statistics of the loaded data"""
         if self.data is None:
             return {}
         
         try:
-            current_date = datetime.now()
-            
-            # Calculate age statistics
-            self.data['age_days'] = (current_date - self.data['Creation Date']).dt.days
+            # One aggregation per column, and plain array counts instead of filtered frames
+            dates = self.data['Creation Date'].agg(['min', 'max'])
+            views = self.data['Page Views'].agg(['sum', 'mean', 'median'])
+            ages = self.data['age_days'].to_numpy()
             
             summary = {
                 'total_pages': len(self.data),
                 'date_range': {
-                    'earliest': self.data['Creation Date'].min().strftime('%Y-%m-%d'),
-                    'latest': self.data['Creation Date'].max().strftime('%Y-%m-%d')
+                    'earliest': dates['min'].strftime('%Y-%m-%d'),
+                    'latest': dates['max'].strftime('%Y-%m-%d')
                 },
                 'page_views': {
-                    'total': int(self.data['Page Views'].sum()),
-                    'average': round(self.data['Page Views'].mean(), 2),
-                    'median': int(self.data['Page Views'].median())
+                    'total': int(views['sum']),
+                    'average': round(views['mean'], 2),
+                    'median': int(views['median'])
                 },
                 'age_distribution': {
-                    'average_age_days': round(self.data['age_days'].mean(), 1),
-                    'pages_over_2_years': len(self.data[self.data['age_days'] > 730]),
-                    'pages_under_30_days': len(self.data[self.data['age_days'] <= 30])
+                    'average_age_days': round(ages.mean(), 1),
+                    'pages_over_2_years': int((ages > 730).sum()),
+                    'pages_under_30_days': int((ages <= 30).sum())
                 }
             }
             
@@ -183,22 +257,25 @@ class ExcelProcessor:
                                output_path: str) -> bool:
         """Export analysis results to Excel file"""
         try:
-            with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-                # Export expired pages
-                if expired_pages:
-                    expired_df = pd.DataFrame(expired_pages)
-                    expired_df.to_excel(writer, sheet_name='Expired Pages', index=False)
-                
-                # Export low engagement pages
-                if low_engagement_pages:
-                    low_engagement_df = pd.DataFrame(low_engagement_pages)
-                    low_engagement_df.to_excel(writer, sheet_name='Low Engagement', index=False)
-                
-                # Export summary
-                summary = self.get_data_summary()
-                if summary:
-                    summary_df = pd.DataFrame([summary])
-                    summary_df.to_excel(writer, sheet_name='Summary', index=False)
+            if XLSXWRITER_AVAILABLE:
+                self._export_streaming(expired_pages, low_engagement_pages, output_path)
+            else:
+                with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+                    # Export expired pages
+                    if expired_pages:
+                        expired_df = pd.DataFrame(expired_pages)
+                        expired_df.to_excel(writer, sheet_name='Expired Pages', index=False)
+                    
+                    # Export low engagement pages
+                    if low_engagement_pages:
+                        low_engagement_df = pd.DataFrame(low_engagement_pages)
+                        low_engagement_df.to_excel(writer, sheet_name='Low Engagement', index=False)
+                    
+                    # Export summary
+                    summary = self.get_data_summary()
+                    if summary:
+                        summary_df = pd.DataFrame([summary])
+                        summary_df.to_excel(writer, sheet_name='Summary', index=False)
             
             logging.info(f"Analysis results exported to: {output_path}")
             return True
@@ -207,19 +284,42 @@ class ExcelProcessor:
             logging.error(f"Error exporting analysis results: {e}")
             return False
     
+    def _export_streaming(self, expired_pages: List[Dict], 
+                          low_engagement_pages: List[Dict], 
+                          output_path: str):
+        """Write the export row by row with xlsxwriter's constant_memory mode"""
+        summary = self.get_data_summary()
+        sheets = [
+            ('Expired Pages', expired_pages),
+            ('Low Engagement', low_engagement_pages),
+            ('Summary', [summary] if summary else [])
+        ]
+        
+        # Rows are flushed to disk as soon as the next row starts, so each sheet is written top to bottom
+        workbook = xlsxwriter.Workbook(output_path, {'constant_memory': True})
+        try:
+            header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center'})
+            for sheet_name, records in sheets:
+                if not records:
+                    continue
+                
+                worksheet = workbook.add_worksheet(sheet_name)
+                columns = list(dict.fromkeys(key for record in records for key in record))
+                worksheet.write_row(0, 0, columns, header_format)
+                for row, record in enumerate(records, start=1):
+                    worksheet.write_row(row, 0, [
+                        str(value) if isinstance(value, (dict, list)) else value
+                        for value in (record.get(col) for col in columns)
+                    ])
+        finally:
+            workbook.close()
+    
     def validate_urls(self, urls: List[str]) -> List[Dict]:
         """Validate URL formats and return validation results"""
         results = []
-        url_pattern = re.compile(
-            r'^https?://'  # http:// or https://
-            r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'  # domain...
-            r'localhost|'  # localhost...
-            r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'  # ...or ip
-            r'(?::\d+)?'  # optional port
-            r'(?:/?|[/?]\S+)$', re.IGNORECASE)
         
         for url in urls:
-            is_valid = bool(url_pattern.match(url)) if url.startswith(('http://', 'https://')) else True
+            is_valid = bool(URL_PATTERN.match(url)) if url.startswith(('http://', 'https://')) else True
             results.append({
                 'url': url,
                 'is_valid': is_valid,
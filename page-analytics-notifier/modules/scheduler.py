@@ -12,6 +12,9 @@ from apscheduler.triggers.cron import CronTrigger
 import time
 import os
 
+# libyaml-backed loader when PyYAML was built with it
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
 class NotificationScheduler:
     def __init__(self, config_path: str = "config/settings.yaml"):
         """Initialize scheduler with configuration"""
@@ -24,7 +27,7 @@ class NotificationScheduler:
         """Load configuration from YAML file"""
         try:
             with open(config_path, 'r') as file:
-                return yaml.safe_load(file)
+                return yaml.load(file, Loader=_YAML_LOADER)
         except Exception as e:
             logging.error(f"Error loading config: {e}")
             return {}
@@ -143,105 +146,108 @@ class NotificationScheduler:
     
     def _process_file(self, file_path: str) -> bool:
         """Process a single Excel file"""
+        db = None
         try:
             start_time = time.time()
+            now = datetime.now()
+            now_iso = now.isoformat()
             
             # Import modules
             from .excel_processor import ExcelProcessor
-            from .email_service import EmailService
+            from .email_service import EmailService, ALERT_DATE_FORMAT
             from .stakeholder_mapper import StakeholderMapper
             from .database import DatabaseManager
             
             # Initialize components
             processor = ExcelProcessor()
-            email_service = EmailService()
             mapper = StakeholderMapper()
             db = DatabaseManager()
-            
-            # Process Excel file
-            if not processor.read_excel_file(file_path):
-                logging.error(f"Failed to read Excel file: {file_path}")
-                return False
-            
-            # Get thresholds from config
-            thresholds = self.config.get('thresholds', {})
-            expired_days = thresholds.get('expired_page_days', 730)
-            low_engagement_days = thresholds.get('low_engagement_days', 30)
-            low_engagement_views = thresholds.get('low_engagement_views', 5)
-            
-            # Analyze pages
-            expired_pages, low_engagement_pages = processor.analyze_pages(
-                expired_days, low_engagement_days, low_engagement_views
-            )
-            
-            total_pages = len(processor.data) if processor.data is not None else 0
-            alerts_generated = 0
-            emails_sent = 0
-            errors = 0
-            
-            # Process expired pages
-            for page in expired_pages:
-                try:
-                    recipient = mapper.get_stakeholder_email(page['page_url'])
-                    
-                    # Check if alert was sent recently
-                    if db.check_recent_alert(page['page_url'], 'expired', 7):
-                        logging.debug(f"Skipping recent alert for {page['page_url']}")
-                        continue
-                    
-                    # Send email
-                    if email_service.send_expired_page_alert(page, recipient):
-                        db.log_alert(
-                            page['page_url'], 'expired', recipient,
-                            page['creation_date'], page['page_views'],
-                            page['page_age_days'], 'sent'
-                        )
-                        emails_sent += 1
-                    else:
-                        db.log_alert(
+            alert_date = now.strftime(ALERT_DATE_FORMAT)
+            
+            # Closes the SMTP sessions however processing ends
+            with EmailService() as email_service:
+                # Process Excel file
+                if not processor.read_excel_file(file_path):
+                    logging.error(f"Failed to read Excel file: {file_path}")
+                    return False
+                
+                # Get thresholds from config
+                thresholds = self.config.get('thresholds', {})
+                expired_days = thresholds.get('expired_page_days', 730)
+                low_engagement_days = thresholds.get('low_engagement_days', 30)
+                low_engagement_views = thresholds.get('low_engagement_views', 5)
+                
+                # Analyze pages
+                expired_pages, low_engagement_pages = processor.analyze_pages(
+                    expired_days, low_engagement_days, low_engagement_views
+                )
+                
+                total_pages = len(processor.data) if processor.data is not None else 0
+                alerts_generated = 0
+                emails_sent = 0
+                errors = 0
+                
+                # Process expired pages
+                for page in expired_pages:
+                    alert_id = None
+                    try:
+                        recipient = mapper.get_stakeholder_email(page['page_url'])
+                        
+                        # Claim the page unless it was alerted recently or by a concurrent run
+                        alert_id = db.claim_alerts([(
                             page['page_url'], 'expired', recipient,
-                            page['creation_date'], page['page_views'],
-                            page['page_age_days'], 'failed', 'Email sending failed'
-                        )
+                            page['creation_date'], page['page_views'], page['page_age_days']
+                        )], 7, now_iso)[0]
+                        if alert_id is None:
+                            logging.debug(f"Skipping recent alert for {page['page_url']}")
+                            continue
+                        
+                        # Send email
+                        if email_service.send_expired_page_alert(page, recipient, alert_date):
+                            db.finish_alerts([(alert_id, 'sent', None)])
+                            emails_sent += 1
+                        else:
+                            db.finish_alerts([(alert_id, 'failed', 'Email sending failed')])
+                            errors += 1
+                        
+                        alerts_generated += 1
+                        
+                    except Exception as e:
+                        logging.error(f"Error processing expired page {page['page_url']}: {e}")
+                        if alert_id is not None:
+                            db.finish_alerts([], [alert_id])
                         errors += 1
-                    
-                    alerts_generated += 1
-                    
-                except Exception as e:
-                    logging.error(f"Error processing expired page {page['page_url']}: {e}")
-                    errors += 1
-            
-            # Process low engagement pages
-            for page in low_engagement_pages:
-                try:
-                    recipient = mapper.get_stakeholder_email(page['page_url'])
-                    
-                    # Check if alert was sent recently
-                    if db.check_recent_alert(page['page_url'], 'low_engagement', 7):
-                        logging.debug(f"Skipping recent alert for {page['page_url']}")
-                        continue
-                    
-                    # Send email
-                    if email_service.send_low_engagement_alert(page, recipient):
-                        db.log_alert(
-                            page['page_url'], 'low_engagement', recipient,
-                            page['creation_date'], page['page_views'],
-                            page['days_since_creation'], 'sent'
-                        )
-                        emails_sent += 1
-                    else:
-                        db.log_alert(
+                
+                # Process low engagement pages
+                for page in low_engagement_pages:
+                    alert_id = None
+                    try:
+                        recipient = mapper.get_stakeholder_email(page['page_url'])
+                        
+                        # Claim the page unless it was alerted recently or by a concurrent run
+                        alert_id = db.claim_alerts([(
                             page['page_url'], 'low_engagement', recipient,
-                            page['creation_date'], page['page_views'],
-                            page['days_since_creation'], 'failed', 'Email sending failed'
-                        )
+                            page['creation_date'], page['page_views'], page['days_since_creation']
+                        )], 7, now_iso)[0]
+                        if alert_id is None:
+                            logging.debug(f"Skipping recent alert for {page['page_url']}")
+                            continue
+                        
+                        # Send email
+                        if email_service.send_low_engagement_alert(page, recipient, alert_date):
+                            db.finish_alerts([(alert_id, 'sent', None)])
+                            emails_sent += 1
+                        else:
+                            db.finish_alerts([(alert_id, 'failed', 'Email sending failed')])
+                            errors += 1
+                        
+                        alerts_generated += 1
+                        
+                    except Exception as e:
+                        logging.error(f"Error processing low engagement page {page['page_url']}: {e}")
+                        if alert_id is not None:
+                            db.finish_alerts([], [alert_id])
                         errors += 1
-                    
-                    alerts_generated += 1
-                    
-                except Exception as e:
-                    logging.error(f"Error processing low engagement page {page['page_url']}: {e}")
-                    errors += 1
             
             # Log processing run
             processing_time = time.time() - start_time
@@ -256,6 +262,9 @@ class NotificationScheduler:
         except Exception as e:
             logging.error(f"Error processing file {file_path}: {e}")
             return False
+        finally:
+            if db is not None:
+                db.close()
     
     def _cleanup_old_data(self):
         """Clean up old database entries"""
@@ -264,7 +273,10 @@ class NotificationScheduler:
             
             from .database import DatabaseManager
             db = DatabaseManager()
-            db.cleanup_old_logs(90)  # Keep 90 days of logs
+            try:
+                db.cleanup_old_logs(90)  # Keep 90 days of logs
+            finally:
+                db.close()
             
             logging.info("Database cleanup completed")
             
@@ -6,9 +6,18 @@ Maps page URLs to responsible stakeholder email addresses
 import yaml
 import logging
 import re
+from functools import lru_cache
 from typing import Dict, Optional, List
 from urllib.parse import urlparse
 
+# libyaml-backed loader when PyYAML was built with it
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+# Distinct normalized URL paths remembered per mapper
+EMAIL_CACHE_SIZE = 4096
+
 class StakeholderMapper:
     def __init__(self, config_path: str = "config/stakeholders.yaml", 
                  settings_path: str = "config/settings.yaml"):
@@ -16,12 +25,13 @@ class StakeholderMapper:
         self.stakeholder_config = self._load_config(config_path)
         self.settings_config = self._load_config(settings_path)
         self.default_admin_email = self.settings_config.get('email', {}).get('default_admin_email', 'admin@company.com')
+        self._cached_email = lru_cache(maxsize=EMAIL_CACHE_SIZE)(self._find_email)
         
     def _load_config(self, config_path: str) -> Dict:
         """Load configuration from YAML file"""
         try:
             with open(config_path, 'r') as file:
-                return yaml.safe_load(file)
+                return yaml.load(file, Loader=_YAML_LOADER)
         except Exception as e:
             logging.error(f"Error loading config {config_path}: {e}")
             return {}
@@ -29,35 +39,38 @@ class StakeholderMapper:
     def get_stakeholder_email(self, page_url: str) -> str:
         """Get stakeholder email for a given page URL"""
         try:
-            # Clean and normalize URL
+            # Clean and normalize URL; pages sharing a path resolve once
             normalized_url = self._normalize_url(page_url)
-            
-            # Try exact matches first (highest priority)
-            exact_email = self._check_exact_matches(normalized_url)
-            if exact_email:
-                logging.debug(f"Found exact match for {page_url}: {exact_email}")
-                return exact_email
-            
-            # Try pattern matches
-            pattern_email = self._check_pattern_matches(normalized_url)
-            if pattern_email:
-                logging.debug(f"Found pattern match for {page_url}: {pattern_email}")
-                return pattern_email
-            
-            # Try department fallbacks based on URL structure
-            department_email = self._check_department_fallbacks(normalized_url)
-            if department_email:
-                logging.debug(f"Found department fallback for {page_url}: {department_email}")
-                return department_email
-            
-            # Return default admin email
-            logging.debug(f"Using default admin email for {page_url}: {self.default_admin_email}")
-            return self.default_admin_email
+            return self._cached_email(normalized_url)
             
         except Exception as e:
             logging.error(f"Error getting stakeholder email for {page_url}: {e}")
             return self.default_admin_email
     
+    def _find_email(self, normalized_url: str) -> str:
+        """Resolve the stakeholder email for a normalized URL path"""
+        # Try exact matches first (highest priority)
+        exact_email = self._check_exact_matches(normalized_url)
+        if exact_email:
+            logging.debug(f"Found exact match for {normalized_url}: {exact_email}")
+            return exact_email
+        
+        # Try pattern matches
+        pattern_email = self._check_pattern_matches(normalized_url)
+        if pattern_email:
+            logging.debug(f"Found pattern match for {normalized_url}: {pattern_email}")
+            return pattern_email
+        
+        # Try department fallbacks based on URL structure
+        department_email = self._check_department_fallbacks(normalized_url)
+        if department_email:
+            logging.debug(f"Found department fallback for {normalized_url}: {department_email}")
+            return department_email
+        
+        # Return default admin email
+        logging.debug(f"Using default admin email for {normalized_url}: {self.default_admin_email}")
+        return self.default_admin_email
+    
     def _normalize_url(self, url: str) -> str:
         """Normalize URL for consistent matching"""
         try:
@@ -269,8 +282,7 @@ class StakeholderMapper:
     
     def _validate_email(self, email: str) -> bool:
         """Validate email address format"""
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return bool(re.match(pattern, email))
+        return EMAIL_PATTERN.match(email) is not None
     
     def add_stakeholder_mapping(self, url: str, email: str, mapping_type: str = 'exact') -> bool:
         """Add new stakeholder mapping (for dynamic configuration)"""
@@ -286,6 +298,7 @@ class StakeholderMapper:
                     self.stakeholder_config['stakeholders']['exact_matches'] = {}
                 
                 self.stakeholder_config['stakeholders']['exact_matches'][url] = email
+                self._cached_email.cache_clear()
                 logging.info(f"Added exact mapping: {url} -> {email}")
                 return True
             
@@ -303,6 +316,7 @@ class StakeholderMapper:
                     self.stakeholder_config['stakeholders']['pattern_matches'] = {}
                 
                 self.stakeholder_config['stakeholders']['pattern_matches'][url] = email
+                self._cached_email.cache_clear()
                 logging.info(f"Added pattern mapping: {url} -> {email}")
                 return True
             
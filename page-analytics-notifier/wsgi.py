@@ -0,0 +1,12 @@
+"""
+WSGI entry point for Page Analytics Notification System
+Run with: gunicorn -c gunicorn.conf.py wsgi:application
+"""
+
+from app import app, load_config, scheduler
+
+# Start scheduler if enabled
+if load_config().get('scheduler', {}).get('enabled', False):
+    scheduler.start_scheduler()
+
+application = app